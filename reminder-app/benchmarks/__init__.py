@@ -0,0 +1,4 @@
+"""Benchmarks for loading, saving, changing, searching, scheduling and showing reminders.
+
+Run from reminder-app with ``python -m benchmarks``; see ``--help``.
+"""
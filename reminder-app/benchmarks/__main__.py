@@ -0,0 +1,201 @@
+"""Time the main reminder paths on synthetic data and check them against a baseline.
+
+    python -m benchmarks                          # default sizes, every backend
+    python -m benchmarks --sizes 10 1000 1000000
+    python -m benchmarks --render                 # also fill the list widget (needs Kivy)
+    python -m benchmarks --save-baseline          # record the results in baseline.json
+
+Each case is timed as the best of a few runs and then run once more under
+tracemalloc for its peak memory; tracemalloc only sees Python allocations, so SQLite's own
+memory is not counted. A case that takes more than --tolerance times its
+baseline time or memory is reported as a regression and the run exits with
+status 1.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from reminder_core import Reminders, open_store
+from reminder_core.scheduler import ReminderScheduler
+from .synthetic import write_reminders
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [10, 1000, 100000]
+BACKENDS = {'json': ".json", 'binary': ".snap", 'sqlite': ".db", 'sharded': ".shards"}
+MUTATIONS = 100
+# Times are the best of this many runs, unless the runs so far took longer than TIME_BUDGET
+REPEAT = 3
+TIME_BUDGET = 2.0
+# Differences below these are noise whatever the ratio
+MIN_SECONDS = 0.005
+MIN_PEAK = 64 * 1024
+
+
+class IdleClock:
+    """Clock for the scheduler that accepts timers and never fires them."""
+    def schedule_once(self, callback, timeout=0):
+        return self
+
+    def cancel(self):
+        pass
+
+
+def measure(action):
+    times = []
+    while len(times) < REPEAT and sum(times) < TIME_BUDGET:
+        # As timeit does, keep collection pauses out of the timings
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            action()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    tracemalloc.start()
+    try:
+        action()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def bench_store(path, render):
+    """Yield (phase, seconds, peak) for one reminder file."""
+    reminders = None
+
+    def load():
+        nonlocal reminders
+        if reminders is not None:
+            reminders.close()
+        reminders = Reminders(open_store(path))
+        reminders.load()
+
+    def save():
+        reminders.store.save()
+
+    def mutate():
+        added = [reminders.add_specific("2024-06-01", "benchmark reminder") for _ in range(MUTATIONS)]
+        for reminder in reversed(added):
+            reminders.delete(reminder)
+
+    def index():
+        reminders.search_indexes = {}
+        reminders.search('specific', "bu")
+
+    def search():
+        reminders.search('specific', "bu")
+
+    def schedule():
+        ReminderScheduler(reminders.store, IdleClock(), lambda title, message: None).start()
+
+    phases = [('load', load), ('save', save), (f'mutate x{2 * MUTATIONS}', mutate),
+              ('index', index), ('search', search), ('schedule', schedule)]
+    if render:
+        reminder_list_class, clock = import_list_widget()
+        phases.append(('render', lambda: fill_list(reminders, reminder_list_class, clock)))
+    try:
+        for phase, action in phases:
+            yield (phase,) + measure(action)
+    finally:
+        reminders.close()
+
+
+def import_list_widget():
+    """Import Kivy and the app only when rendering is benchmarked.
+
+    Set KIVY_GL_BACKEND=mock to run without a display.
+    """
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    from kivy.clock import Clock
+    import main
+    return main.ReminderList, Clock
+
+
+def fill_list(reminders, reminder_list_class, clock):
+    """Do what the specific screen does on entering it: build every row and lay out the list."""
+    reminder_list = reminder_list_class(edit_callback=None, delete_callback=None, size=(480, 800))
+    reminder_list.set_rows(
+        {'key': reminder, 'date': date, 'reminder_text': reminder.text}
+        for date, date_reminders in reminders.reminders_between()
+        for reminder in date_reminders
+    )
+    for _ in range(2):
+        clock.tick()
+
+
+def compare(key, seconds, peak, baseline, tolerance):
+    """Return a note on how a result compares with its baseline and whether it regressed."""
+    base = baseline.get(key)
+    if base is None:
+        return "new", False
+    time_ratio = seconds / base["seconds"] if base["seconds"] else 1.0
+    peak_ratio = peak / base["peak"] if base["peak"] else 1.0
+    regressed = (
+        (time_ratio > tolerance and seconds - base["seconds"] > MIN_SECONDS)
+        or (peak_ratio > tolerance and peak - base["peak"] > MIN_PEAK)
+    )
+    note = f"time x{time_ratio:.2f}  mem x{peak_ratio:.2f}"
+    return (note + "  REGRESSION" if regressed else note), regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="number of reminders in each synthetic file")
+    parser.add_argument("--backends", nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--render", action="store_true", help="also time filling the reminder list widget")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=2.0,
+                        help="slowdown or memory growth factor that counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = {}
+    regressions = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            source = os.path.join(directory, f"reminders-{size}.json")
+            for backend in args.backends:
+                path = os.path.splitext(source)[0] + BACKENDS[backend]
+                write_reminders(source, size)
+                if path.endswith(".snap"):
+                    write_reminders(path, size)
+                # The first open of a new database or shard directory imports the JSON file next to it
+                store = open_store(path)
+                store.load()
+                store.close()
+                for phase, seconds, peak in bench_store(path, args.render):
+                    key = f"{backend}/{size}/{phase}"
+                    results[key] = {"seconds": round(seconds, 6), "peak": peak}
+                    note, regressed = compare(key, seconds, peak, baseline, args.tolerance)
+                    regressions += regressed
+                    print(f"{backend:<7}{size:>9}  {phase:<12}{seconds * 1000:>10.1f} ms"
+                          f"{peak / 1024 / 1024:>9.2f} MB  {note}", flush=True)
+
+    if args.save_baseline:
+        baseline.update(results)
+        baseline["_meta"] = {"python": platform.python_version(), "machine": platform.machine(),
+                             "system": platform.system()}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} regression(s) against {args.baseline}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import json
+import random
+import datetime
+from reminder_core.snapshot import write_binary
+
+WORDS = ("call", "buy", "pay", "email", "book", "water", "plants", "rent", "gym", "dentist",
+         "mom", "report", "meeting", "groceries", "car", "insurance", "birthday", "gift",
+         "train", "tickets", "review", "invoice", "walk", "dog", "laundry", "passport")
+RULES = ("daily 08:00", "weekdays 07:30", "weekly mon,wed 18:00", "every 2 weeks 10:00",
+         "monthly 1,15 09:00", "every 3 days 12:00")
+
+
+def make_reminders(count, seed=0, start=datetime.date(2024, 1, 1), days=3 * 365):
+    """Return reminders.json data with count reminders in all.
+
+    About 10% are daily and 2% recurring, and the rest are spread over days
+    dates starting at start.
+    """
+    rng = random.Random(seed)
+    text = lambda: " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+    daily = [text() for _ in range(count // 10)]
+    recurring = [{"text": text(), "rule": rng.choice(RULES)} for _ in range(count // 50)]
+    specific = {}
+    for _ in range(count - len(daily) - len(recurring)):
+        date = (start + datetime.timedelta(days=rng.randrange(days))).isoformat()
+        specific.setdefault(date, []).append(text())
+    return {
+        "specific_date_reminders": specific,
+        "daily_reminders": daily,
+        "recurring_reminders": recurring
+    }
+
+
+def write_reminders(path, count, seed=0):
+    """Write synthetic reminders as JSON, or as a binary snapshot for a .snap path."""
+    if path.endswith(".snap"):
+        write_binary(path, make_reminders(count, seed))
+        return
+    with open(path, 'w') as f:
+        json.dump(make_reminders(count, seed), f)
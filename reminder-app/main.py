@@ -1,7 +1,10 @@
 import os
-import json
-import random
+import time
+import queue
+import bisect
+import sqlite3
 import datetime
+import threading
 from kivy.metrics import dp
 from kivy.app import App
 from kivy.clock import Clock
@@ -11,88 +14,348 @@ from kivy.uix.popup import Popup
 from kivy.animation import Animation
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.textinput import TextInput
-from plyer import notification
-from kivy.properties import ObjectProperty
+from kivy.uix.progressbar import ProgressBar
 from kivy.uix.scrollview import ScrollView
+from kivy.properties import ObjectProperty
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.utils import get_color_from_hex
 from kivy.uix.screenmanager import Screen, ScreenManager
+from reminder_core import Reminders, perf
+from reminder_core.storage import open_store, BackgroundWriter
+from reminder_core.clock import DayClock
+from reminder_core.scheduler import ReminderScheduler
+from reminder_core.search import query_words
+from reminder_core.selection import ShuffleBag, selection_path
+from reminder_core.dispatch import NotificationDispatcher
+from reminder_core.recurrence import parse_rule
+from reminder_core.transfer import parse_file, export_file, reminder_items
+
+
+def plyer_notify(title, message):
+    from plyer import notification  # Imported on first use to keep it out of startup
+    notification.notify(
+        title=title,
+        message=message,
+        app_name="ReminderApp",
+        app_icon=None,
+        timeout=10,
+    )
+
 
 class ReminderApp(App):
+    """Kivy front end for the reminder model in reminder_core.
+
+    The model's change notifications are re-dispatched as on_reminder_added,
+    on_reminder_updated and on_reminder_removed with a ReminderChange, so
+    screens can patch just the affected row. on_reminders_reset tells them to
+    refill from scratch, e.g. when a change could not be applied.
+    on_day_changed is dispatched with the new date at local midnight.
+    """
+    __events__ = ('on_reminder_added', 'on_reminder_updated', 'on_reminder_removed', 'on_reminders_reset',
+                  'on_day_changed')
+
+    # Use "reminders.db" to keep reminders in the SQLite backend
+    storage_file = "reminders.json"
+    # Adds a button for the performance screen; REMINDER_PERF=1 also turns this on
+    show_performance = perf.enabled
+    # How many daily reminders are sent each day, at random times
+    daily_notifications = 1
+    # Called as notification_backend(title, message) on the dispatcher's worker thread
+    notification_backend = staticmethod(plyer_notify)
+    # Seconds between checks for changes other processes made to the reminders file
+    poll_interval = 2
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.daily_reminders = []
-        self.specific_date_reminders = {}
-        
-        self.daily_notification_scheduled = False
+        self.reminders = Reminders(self.create_store())
+        self.reminders.subscribe(self.forward_change)
+        # Today's date for the screens and the scheduler, refreshed once at midnight
+        self.days = DayClock(Clock)
+        self.days.subscribe(lambda day: self.dispatch('on_day_changed', day))
+        self.dispatcher = NotificationDispatcher(self.notification_backend, on_sent=self.notification_sent,
+                                                 on_error=self.report_notification_error)
+
+        self.scheduler = None
+        self.loading = False
+        self.load_queue = queue.Queue()
+        self.apply_loaded_trigger = Clock.create_trigger(self.apply_loaded)
+        self.poll_event = None
         self.screen_manager = None
         self.main_screen = None
         self.daily_reminders_screen = None
         self.specific_reminders_screen = None
+        self.recurring_reminders_screen = None
+        self.performance_screen = None
+        self.transfer_screen = None
 
     def build(self):
-        self.load_reminders()  # Load reminders on startup
+        self.load_reminders()  # Load reminders in the background; the UI shows up right away
         self.screen_manager = ScreenManager()
 
         self.main_screen = MainScreen(name='main', app=self)
         self.daily_reminders_screen = DailyRemindersScreen(name='daily', app=self)
         self.specific_reminders_screen = SpecificRemindersScreen(name='specific', app=self)
+        self.recurring_reminders_screen = RecurringRemindersScreen(name='recurring', app=self)
+        self.performance_screen = PerformanceScreen(name='performance', app=self)
+        self.transfer_screen = TransferScreen(name='transfer', app=self)
 
         self.screen_manager.add_widget(self.main_screen)
         self.screen_manager.add_widget(self.daily_reminders_screen)
         self.screen_manager.add_widget(self.specific_reminders_screen)
-
-        # Schedule daily reminder check
-        Clock.schedule_interval(self.schedule_daily_notification, 3600)
-        # Schedule specific date reminder check
-        Clock.schedule_once(self.check_specific_date_reminder, 1)
+        self.screen_manager.add_widget(self.recurring_reminders_screen)
+        self.screen_manager.add_widget(self.performance_screen)
+        self.screen_manager.add_widget(self.transfer_screen)
+
+        # Another process, e.g. the command line, may write the reminders file too
+        self.poll_event = Clock.schedule_interval(self.check_external_changes, self.poll_interval)
+
+        self.bind(
+            on_reminder_added=self.reschedule,
+            on_reminder_updated=self.reschedule,
+            on_reminder_removed=self.reschedule,
+            on_reminders_reset=self.reschedule_all
+        )
 
         return self.screen_manager
     
     def get_storage_path(self):
-        """Get a platform-appropriate path for storing the JSON file."""
+        """Get a platform-appropriate path for storing the reminders file."""
         # from plyer import storagepath
         # app_dir = storagepath.get_application_dir()
         # file_path = os.path.join(app_dir, "reminders.json")
         # # Ensure the directory exists
         # os.makedirs(app_dir, exist_ok=True)
-        file_path = os.path.join(os.getcwd(), "reminders.json")
+        file_path = os.path.join(os.getcwd(), self.storage_file)
         return file_path
 
+    def create_store(self):
+        """Open the storage backend with writes handed to a background writer."""
+        store = open_store(self.get_storage_path())
+        store.writer = BackgroundWriter(store, on_error=self.report_write_error)
+        return store
+
+    def report_write_error(self, error):
+        # Runs on the writer thread; the changes stay staged and go out with the next write
+        print(f"Error saving reminders: {error}")
+        Clock.schedule_once(lambda dt: self.show_storage_error(f"Failed to save reminders: {str(error)}"))
+
+    @property
+    def store(self):
+        return self.reminders.store
+
+    @property
+    def daily_reminders(self):
+        return self.reminders.daily_reminders
+
+    @property
+    def recurring_reminders(self):
+        return self.reminders.recurring_reminders
+
+    def reminders_on(self, date):
+        """Return the specific reminders on a "%Y-%m-%d" date as Reminder records."""
+        return self.reminders.reminders_on(date)
+
+    def reminders_between(self, start=None, end=None):
+        return self.reminders.reminders_between(start, end)
+
+    def search_reminders(self, kind, query):
+        return self.reminders.search(kind, query)
+
+    def forward_change(self, event, change):
+        if event == 'reset':
+            self.dispatch('on_reminders_reset')
+        else:
+            self.dispatch(f'on_reminder_{event}', change)
+
     def save_reminders(self):
-        """Save specific and daily reminders to a JSON file."""
-        data = {
-            "specific_date_reminders": self.specific_date_reminders,
-            "daily_reminders": self.daily_reminders
-        }
+        """Write a full snapshot of the reminders, folding in any journaled changes."""
+        try:
+            self.store.save()
+        except Exception as e:
+            self.show_storage_error(f"Failed to save reminders: {str(e)}")
+            print(f"Error saving reminders: {e}")
+
+    def flush_reminders(self):
+        """Write the changes the background writer has not written yet."""
+        try:
+            self.store.writer.flush()
+        except Exception as e:
+            self.show_storage_error(f"Failed to save reminders: {str(e)}")
+            print(f"Error saving reminders: {e}")
+
+    def update_store(self, mutate, *args):
+        """Apply a single mutation through the model; the background writer persists it.
+
+        Returns False if it failed, in which case the model has already asked
+        screens to refill.
+        """
+        if self.loading:
+            self.show_storage_error("Reminders are still loading, try again in a moment.")
+            return False
         try:
-            with open(self.get_storage_path(), 'w') as f:
-                json.dump(data, f, indent=4)
+            mutate(*args)
         except Exception as e:
-            # Display error to user via a screen (e.g., main_screen)
-            if hasattr(self, 'main_screen') and hasattr(self.main_screen, 'error_label'):
-                self.main_screen.error_label.text = f"Failed to save reminders: {str(e)}"
-                self.fade_error_message(self.main_screen.error_label)
+            self.show_storage_error(f"Failed to save reminders: {str(e)}")
             print(f"Error saving reminders: {e}")
+            return False
+        return True
+
+    def add_daily_reminder(self, text):
+        self.update_store(self.reminders.add_daily, text)
+
+    def add_recurring_reminder(self, text, rule):
+        self.update_store(self.reminders.add_recurring, text, rule)
+
+    def add_specific_reminder(self, date, text):
+        self.update_store(self.reminders.add_specific, date, text)
+
+    def edit_reminder(self, reminder, text, rule=None):
+        self.update_store(self.reminders.update, reminder, text, rule)
+
+    def remove_reminder(self, reminder):
+        self.update_store(self.reminders.delete, reminder)
+
+    def import_reminders(self, items):
+        """Add parsed (kind, text, date, rule) items in one batch and one write."""
+        return self.update_store(self.reminders.add_many, items)
+
+    def on_reminder_added(self, change):
+        pass
+
+    def on_reminder_updated(self, change):
+        pass
+
+    def on_reminder_removed(self, change):
+        pass
+
+    def on_reminders_reset(self):
+        pass
+
+    def on_day_changed(self, day):
+        pass
 
     def load_reminders(self):
-        """Load specific and daily reminders from a JSON file."""
-        file_path = self.get_storage_path()
-        print("filepath", file_path)
+        """Start loading reminders from the storage backend.
+
+        The file is parsed on a worker thread and the parsed batches are queued
+        for apply_loaded() on the main thread, so the first frame does not wait
+        for the file no matter how large it is.
+        """
+        print("filepath", self.store.path)
+        if not os.path.exists(self.store.path):
+            print("file-path-no-exists")
+        self.loading = True
         try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                    self.specific_date_reminders.update(data.get("specific_date_reminders", {}))
-                    self.daily_reminders.extend(data.get("daily_reminders", []))
-            else:
-                print("file-path-no-exists")
+            self.store.begin_load()
         except Exception as e:
-            # Display error to user via a screen
-            if hasattr(self, 'main_screen') and hasattr(self.main_screen, 'error_label'):
-                self.main_screen.error_label.text = f"Failed to load reminders: {str(e)}"
-                self.fade_error_message(self.main_screen.error_label)
-            self.specific_date_reminders = {}
-            self.daily_reminders = []
+            # Right away, as the screens would otherwise query a store that did not open
+            self.recover_from_load_error(e)
+            return
+        # A queue per load, so a worker left over from a failed one cannot feed the next
+        self.load_queue = queue.Queue()
+        threading.Thread(target=self.read_reminders, args=(self.store, self.load_queue), daemon=True).start()
+
+    def read_reminders(self, store, load_queue):
+        """Worker thread: parse the stored reminders and queue them in batches."""
+        try:
+            for batch in store.read():
+                load_queue.put(batch)
+                self.apply_loaded_trigger()
+            load_queue.put(None)
+        except Exception as e:
+            load_queue.put(e)
+        self.apply_loaded_trigger()
+
+    @perf.timed("load.apply_batches")
+    def apply_loaded(self, dt, frame_budget=0.008):
+        """Take queued batches into the store until this frame's budget is used up."""
+        deadline = time.perf_counter() + frame_budget
+        while time.perf_counter() < deadline:
+            try:
+                batch = self.load_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if isinstance(batch, Exception):
+                    raise batch
+                if batch is None:
+                    self.store.finish_load()
+                    self.finish_loading()
+                    return
+                self.store.add_loaded(batch)
+            except Exception as e:
+                self.recover_from_load_error(e)
+                return
+        self.apply_loaded_trigger()
+
+    def recover_from_load_error(self, error):
+        """Carry on with no reminders after a failed load.
+
+        Files that cannot be parsed are moved aside, so saving starts new
+        ones. After any other error, e.g. a file that cannot be opened, the
+        files are left as they are, and the new store only adds to them.
+        """
+        print(f"Error loading reminders: {error}")
+        message = f"Failed to load reminders: {str(error)}"
+        self.store.writer.stop()
+        try:
+            self.store.close()
+        except Exception as e:
+            print(f"Error closing reminders: {e}")
+        if isinstance(error, (ValueError, sqlite3.DatabaseError)):
+            try:
+                moved = self.store.set_aside()
+                if moved:
+                    message += f"\nThe damaged file was kept as {os.path.basename(moved[0])}"
+            except OSError as e:
+                print(f"Error moving the damaged reminders aside: {e}")
+        store = self.reminders.store = self.create_store()
+        self.load_queue = queue.Queue()
+        try:
+            store.begin_load()
+            store.finish_load()
+        except Exception as e:
+            print(f"Error starting with no reminders: {e}")
+        self.finish_loading()
+        self.show_storage_error(message)
+
+    def check_external_changes(self, *args):
+        """Patch in the changes another process made to the store, or reload it if that is needed."""
+        if self.loading:
+            return
+        try:
+            if self.reminders.refresh():
+                return
+        except Exception as e:
+            print(f"Error reading changes to reminders: {e}")
+            return
+        try:
+            # What is staged goes out first, for the reload to read back
+            self.store.writer.flush()
+        except Exception as e:
+            print(f"Error saving reminders, reloading later: {e}")
+            return
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+        self.load_reminders()
+
+    def finish_loading(self):
+        self.loading = False
+        self.reminders.notify('reset')
+        # Arm notifications for today; the scheduler re-plans at midnight and on changes
+        self.scheduler = ReminderScheduler(self.store, Clock, self.send_notification,
+                                           daily_count=self.daily_notifications,
+                                           bag=ShuffleBag(selection_path(self.store.path)), days=self.days)
+        self.scheduler.start()
+
+    def show_storage_error(self, message):
+        # Display error to user via a screen (e.g., main_screen)
+        if hasattr(self, 'main_screen') and hasattr(self.main_screen, 'error_label'):
+            self.main_screen.error_label.text = message
+            self.fade_error_message(self.main_screen.error_label)
 
     def fade_error_message(self, error_label):
         """Fade out the error message on a given label."""
@@ -105,50 +368,52 @@ class ReminderApp(App):
         error_label.opacity = 1
         error_label.text = ""
 
-    def get_random_reminder(self):
-        return random.choice(self.daily_reminders)
-
-    def get_random_time(self, start_hour=6, end_hour=18):
-        random_hour = random.randint(start_hour, end_hour)
-        random_minute = random.randint(0, 59)
-        return datetime.time(random_hour, random_minute)
-
-    def schedule_daily_notification(self, dt):
-        now = datetime.datetime.now()
-        if 6 <= now.hour < 18 and not self.daily_notification_scheduled:
-            random_time = self.get_random_time()
-            schedule_at = datetime.datetime.combine(now.date(), random_time)
-            delay = (schedule_at - now).total_seconds()
-            if delay > 0:
-                reminder_text = self.get_random_reminder()
-                Clock.schedule_once(lambda dt: self.send_notification("Daily Reminder", reminder_text), delay)
-                # print(f"Daily notification scheduled for {schedule_at.strftime('%H:%M:%S')}: {reminder_text}")
-                self.daily_notification_scheduled = True
-        elif now.hour >= 18:
-            self.daily_notification_scheduled = False
-
-    def check_specific_date_reminder(self, dt):
-        today = datetime.date.today().strftime("%Y-%m-%d")
-        if today in self.specific_date_reminders:
-            reminder_text = self.specific_date_reminders[today]
-            self.send_notification("Specific Reminder", reminder_text)
-            # print(f"Specific date reminder for today ({today}): {reminder_text}")
+    def reschedule(self, app, change):
+        if self.scheduler is not None:
+            self.scheduler.reminders_changed(change)
+
+    def reschedule_all(self, app):
+        if self.scheduler is not None:
+            self.scheduler.reminders_reset()
 
     def send_notification(self, title, message):
-        notification.notify(
-            title=title,
-            message=message,
-            app_name="ReminderApp",
-            app_icon=None,
-            timeout=10,
-        )
-        self.main_screen.update_reminder_text(f'"{message}"')
+        perf.count("notifications")
+        self.dispatcher.dispatch(title, message)
+
+    def notification_sent(self, title, message):
+        # Runs on the dispatcher thread
+        Clock.schedule_once(lambda dt: self.main_screen.update_reminder_text(f'"{message}"'))
+
+    def report_notification_error(self, error):
+        print(f"Error sending notification: {error}")
 
     def on_pause(self):
+        # A paused app may be killed without on_stop being called
+        self.flush_reminders()
         return True
 
+    def on_stop(self):
+        if self.poll_event is not None:
+            self.poll_event.cancel()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.dispatcher.stop()
+        # close() below writes whatever the writer still had staged
+        self.store.writer.stop()
+        if self.loading:
+            # A partly loaded store must not be written back over the full one
+            return
+        try:
+            self.store.close()
+        except Exception as e:
+            print(f"Error saving reminders: {e}")
+
     def on_resume(self, *args):
-        pass
+        # Timers may have been held up while paused; whatever is overdue goes out as one summary
+        if self.scheduler is not None:
+            self.scheduler.catch_up()
+        self.days.check()
+        self.check_external_changes()
 
 
 class MainScreen(Screen):
@@ -164,12 +429,28 @@ class MainScreen(Screen):
         self.reminders_title = Label(text="Today's Reminders", size_hint_y=None, height=40, font_size=20)
         layout.add_widget(self.reminders_title)
 
-        # ScrollView for reminders
-        self.scroll_view = ScrollView()
-        self.reminders_layout = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None)
-        self.reminders_layout.bind(minimum_height=self.reminders_layout.setter('height'))
-        self.scroll_view.add_widget(self.reminders_layout)
-        layout.add_widget(self.scroll_view)
+        # Label for the last reminder that was sent as a notification
+        self.reminder_text_label = Label(text="", size_hint_y=None, height=dp(40), halign='center', valign='middle')
+        self.reminder_text_label.bind(size=self.reminder_text_label.setter('text_size'))
+        layout.add_widget(self.reminder_text_label)
+
+        self.no_reminders_label = Label(
+            text="Nothing for today...",
+            size_hint=(1, None),
+            height=dp(50),
+            halign='center',
+            valign='middle',
+            font_size=25
+        )
+        self.no_reminders_label.bind(size=self.no_reminders_label.setter('text_size'))
+        layout.add_widget(self.no_reminders_label)
+
+        # Recycled list for reminders
+        self.reminder_list = ReminderList(
+            edit_callback=lambda k, r: self.app.specific_reminders_screen.edit_reminder(k, r),
+            delete_callback=lambda k: self.app.specific_reminders_screen.delete_specific_reminder(k)
+        )
+        layout.add_widget(self.reminder_list)
 
         # Navigation buttons
         specific_button = Button(text="Specific Reminders", size_hint_y=None, height=50)
@@ -180,64 +461,104 @@ class MainScreen(Screen):
         daily_button.bind(on_press=lambda x: self.manager.switch_to(self.app.daily_reminders_screen))
         layout.add_widget(daily_button)
 
+        recurring_button = Button(text="Recurring Reminders", size_hint_y=None, height=50)
+        recurring_button.bind(on_press=lambda x: self.manager.switch_to(self.app.recurring_reminders_screen))
+        layout.add_widget(recurring_button)
+
+        transfer_button = Button(text="Import / Export", size_hint_y=None, height=50)
+        transfer_button.bind(on_press=lambda x: self.manager.switch_to(self.app.transfer_screen))
+        layout.add_widget(transfer_button)
+
+        if self.app.show_performance:
+            performance_button = Button(text="Performance", size_hint_y=None, height=50)
+            performance_button.bind(on_press=lambda x: self.manager.switch_to(self.app.performance_screen))
+            layout.add_widget(performance_button)
+
         self.add_widget(layout)
-        self.bind(size=self.update_reminder_widths)
         self.bind(on_enter=self.update_reminders_display)
+        self.app.bind(
+            on_reminder_added=self.reminder_added,
+            on_reminder_updated=self.reminder_updated,
+            on_reminder_removed=self.reminder_removed,
+            on_reminders_reset=self.update_reminders_display,
+            on_day_changed=self.update_reminders_display
+        )
 
-    def update_reminder_widths(self, *args):
-        """Update the text_size of all reminder labels when screen size changes."""
-        for child in self.reminders_layout.children:
-            if isinstance(child, ReminderWidget):
-                child.label.text_size = (self.width * 0.65 - dp(20), None)
+    def update_reminder_text(self, text):
+        """Show the text of the notification that was just sent."""
+        self.reminder_text_label.text = text
 
     def update_reminders_display(self, *args):
-        """Update the display of today's specific reminders and all daily reminders."""
-        self.reminders_layout.clear_widgets()
-        today = datetime.date.today().strftime('%Y-%m-%d')
-
-        # Add today's specific reminders
-        if today in self.app.specific_date_reminders:
-            reminder_text = self.app.specific_date_reminders[today]
-            reminder_widget = ReminderWidget(
-                date=today,
-                reminder_text=reminder_text,
-                screen_width=self.width,
-                edit_callback=lambda d, r: self.app.specific_reminders_screen.edit_reminder(d, r),
-                delete_callback=lambda d: self.app.specific_reminders_screen.delete_specific_reminder(d)
-            )
-            self.reminders_layout.add_widget(reminder_widget)
-        else:
-            no_reminders_label = Label(
-                text="Nothing for today...",
-                size_hint=(1, None),
-                height=dp(50),
-                halign='center',
-                valign='middle',
-                font_size=25
-            )
-            no_reminders_label.bind(size=lambda instance, value: no_reminders_label.setter('text_size')(instance, value))
-            self.reminders_layout.add_widget(no_reminders_label)
+        """Update the display of today's specific reminders."""
+        today = self.app.days.key
+        self.reminder_list.set_rows(
+            {'key': reminder, 'date': today, 'reminder_text': reminder.text}
+            for reminder in self.app.reminders_on(today)
+        )
+        self.update_placeholder()
+
+    def update_placeholder(self):
+        # Collapse the placeholder instead of removing it so it is built only once
+        has_reminders = bool(self.reminder_list.data)
+        self.no_reminders_label.text = "Loading reminders..." if self.app.loading else "Nothing for today..."
+        self.no_reminders_label.opacity = 0 if has_reminders else 1
+        self.no_reminders_label.height = 0 if has_reminders else dp(50)
+
+    def shows(self, change):
+        """Whether the changed reminder belongs in today's list."""
+        return (change.kind == 'specific' and not self.reminder_list.stale
+                and change.reminder.date == self.app.days.key)
+
+    def reminder_added(self, app, change):
+        if self.shows(change):
+            self.reminder_list.insert_reminder(change.reminder)
+            self.update_placeholder()
+
+    def reminder_updated(self, app, change):
+        if self.shows(change):
+            self.reminder_list.update_reminder(change.reminder)
+
+    def reminder_removed(self, app, change):
+        if self.shows(change):
+            self.reminder_list.remove_reminder(change.reminder)
+            self.update_placeholder()
+
+
+class ReminderLabel(Label):
+    @perf.timed("ui.text_layout")
+    def texture_update(self, *largs):
+        super().texture_update(*largs)
 
 
-class ReminderWidget(BoxLayout):
-    """Custom widget for a reminder with a label and edit button."""
-    def __init__(self, date, reminder_text, screen_width, edit_callback, delete_callback, **kwargs):
+class ReminderWidget(RecycleDataViewBehavior, BoxLayout):
+    """Row for a reminder with a label and edit and delete buttons.
+
+    Rows are created by ReminderList only for the reminders in view and are
+    refilled from its data as the list scrolls. The callbacks receive the
+    row's key, the Reminder it shows.
+    """
+    @perf.timed("ui.create_row")
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'horizontal'
         self.size_hint_y = None
         self.height = dp(50)  # Initial height, will adjust dynamically
         self.spacing = dp(5)
+        self.reminder_list = None
+        self.index = None
+        self.key = None
+        self.reminder_text = ""
 
         # Label for reminder text
-        self.label = Label(
-            text=f"{date}: {reminder_text}",
-            size_hint=(0.8, None),  # 80% for label, leaving space for button
+        self.label = ReminderLabel(
+            size_hint=(0.76, None),  # leave space for the buttons
             height=dp(50),
-            text_size=(screen_width * 0.75 - dp(20), None),  # Constrain width with padding
             halign='left',
             valign='top',
             padding=[dp(5), dp(5)]
         )
+        # Constrain the text to the label width so it wraps
+        self.label.bind(width=lambda label, width: setattr(label, 'text_size', (width, None)))
         self.label.bind(texture_size=self._update_label_size)
         self.add_widget(self.label)
 
@@ -248,8 +569,7 @@ class ReminderWidget(BoxLayout):
             height=dp(50),
             width=dp(50)
         )
-        
-        self.edit_button.bind(on_press=lambda btn, d=date, r=reminder_text: edit_callback(d, r))
+        self.edit_button.bind(on_press=lambda btn: self.reminder_list.edit_callback(self.key, self.reminder_text))
         self.add_widget(self.edit_button)
 
         self.delete_button = Button(
@@ -258,20 +578,95 @@ class ReminderWidget(BoxLayout):
             height=dp(50),
             width=dp(50)
         )
-        self.delete_button.bind(on_press=lambda instance: delete_callback(date))
+        self.delete_button.bind(on_press=lambda instance: self.reminder_list.delete_callback(self.key))
         self.add_widget(self.delete_button)
 
-
+    @perf.timed("ui.refresh_row")
+    def refresh_view_attrs(self, rv, index, data):
+        """Fill the row from its entry in the list data."""
+        self.reminder_list = rv
+        self.index = index
+        self.key = data['key']
+        self.reminder_text = data['reminder_text']
+        # Daily rows have no date and show their position, which changes as rows above come and go
+        prefix = index if data['date'] is None else data['date']
+        self.label.text = f"{prefix}: {data['reminder_text']}"
+
+    @perf.timed("ui.row_resize")
     def _update_label_size(self, instance, texture_size):
         """Update the label and widget height based on text size."""
         self.label.height = texture_size[1] + dp(10)
         self.height = max(self.label.height, dp(50))  # Ensure button height is respected
-        # self.edit_button.height = self.height  # Sync button height
-        # self.delete_button.height = self.height # Sync button height
+
+
+class ReminderList(RecycleView):
+    """Virtualized list of reminders.
+
+    Each entry in data is a dict with the Reminder as 'key', its 'reminder_text'
+    and 'date', the label prefix, or None to show the row's position. Only the rows in view get a ReminderWidget, and those are reused
+    while scrolling, so the cost of a redraw does not grow with the number of
+    reminders. Changes to single reminders go through insert_reminder(),
+    update_reminder() and remove_reminder() so that only the affected entries
+    are refreshed. The list is stale until the first set_rows(); changes made
+    before then are skipped by the screens because the full fill includes them.
+
+    Rows are kept in Reminder order, by date and then id, so a reminder's row
+    is found by bisecting the data.
+    """
+    def __init__(self, edit_callback, delete_callback, **kwargs):
+        super().__init__(**kwargs)
+        self.stale = True
+        self.edit_callback = edit_callback
+        self.delete_callback = delete_callback
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            spacing=dp(10),
+            size_hint_y=None,
+            default_size=(None, dp(50)),
+            default_size_hint=(1, None)
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        # viewclass is stored on the layout, so it can only be set once the layout is added
+        self.viewclass = ReminderWidget
+
+    @perf.timed("ui.fill_list")
+    def set_rows(self, rows):
+        self.data = list(rows)
+        self.stale = False
+
+    def insert_row(self, index, row):
+        self.data.insert(index, row)
+
+    def update_row(self, index, **changes):
+        row = dict(self.data[index])
+        row.update(changes)
+        self.data[index] = row
+
+    def remove_row(self, index):
+        del self.data[index]
+
+    def row_index(self, reminder):
+        return bisect.bisect_left(self.data, reminder.order, key=lambda row: row['key'].order)
+
+    def insert_reminder(self, reminder, date=None):
+        """Insert a row; date is the label prefix and defaults to the reminder's date, None for daily ones."""
+        if date is None:
+            date = reminder.date
+        self.insert_row(self.row_index(reminder), {'key': reminder, 'date': date, 'reminder_text': reminder.text})
+
+    def update_reminder(self, reminder, date=None):
+        if date is None:
+            self.update_row(self.row_index(reminder), reminder_text=reminder.text)
+        else:
+            self.update_row(self.row_index(reminder), reminder_text=reminder.text, date=date)
+
+    def remove_reminder(self, reminder):
+        self.remove_row(self.row_index(reminder))
 
 
 class DailyRemindersScreen(Screen):
-    scroll_view = ObjectProperty(None)
+    reminder_list = ObjectProperty(None)
 
     def __init__(self, app, **kwargs):
         super().__init__(**kwargs)
@@ -281,11 +676,17 @@ class DailyRemindersScreen(Screen):
         self.error_label = Label(text="", color=get_color_from_hex('#FF0000'), size_hint_y=None, height=30)
         layout.add_widget(self.error_label)
 
-        self.scroll_view = ScrollView()
-        self.reminders_layout = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None)
-        self.reminders_layout.bind(minimum_height=self.reminders_layout.setter('height'))
-        self.scroll_view.add_widget(self.reminders_layout)
-        layout.add_widget(self.scroll_view)
+        self.search_input = TextInput(hint_text="Search", multiline=False, size_hint_y=None, height=40)
+        self.search_input.bind(text=self.query_changed)
+        layout.add_widget(self.search_input)
+        # Whether the list holds search results rather than every reminder
+        self.showing_matches = False
+
+        self.reminder_list = ReminderList(
+            edit_callback=self.open_edit_daily_reminder_popup,
+            delete_callback=self.delete_daily_reminder
+        )
+        layout.add_widget(self.reminder_list)
 
         layout.add_widget(Label(size_hint_y=None, height=10))  # Spacer
 
@@ -302,51 +703,88 @@ class DailyRemindersScreen(Screen):
         layout.add_widget(back_button)
 
         self.add_widget(layout)
-        self.bind(size=self.update_reminder_widths)
+        self.refresh_trigger = Clock.create_trigger(self.update_daily_reminders_display)
         self.bind(on_enter=self.update_daily_reminders_display)
+        self.app.bind(
+            on_reminder_added=self.reminder_added,
+            on_reminder_updated=self.reminder_updated,
+            on_reminder_removed=self.reminder_removed,
+            on_reminders_reset=self.reset_reminders_display
+        )
+
+    def reset_reminders_display(self, *args):
+        self.reminder_list.stale = True
+        if self.manager and self.manager.current_screen is self:
+            self.refresh_trigger()
+
+    def searching(self):
+        return bool(query_words(self.search_input.text))
+
+    def query_changed(self, *args):
+        # A first letter is too short to search by, and the list already shows everything
+        if self.searching() or self.showing_matches:
+            self.search_changed()
+
+    def search_changed(self, *args):
+        # Keystrokes within one frame share a single search
+        self.reminder_list.stale = True
+        self.refresh_trigger()
+
+    def reminder_added(self, app, change):
+        if change.kind == 'daily' and not self.reminder_list.stale:
+            if self.searching():
+                self.search_changed()
+            else:
+                # New daily reminders go last, and the label shows the position
+                self.reminder_list.insert_reminder(change.reminder)
 
-    def update_reminder_widths(self, *args):
-        """Update the text_size of all reminder labels when screen size changes."""
-        for child in self.reminders_layout.children:
-            if isinstance(child, ReminderWidget):
-                child.label.text_size = (self.width * 0.65 - dp(20), None)
+    def reminder_updated(self, app, change):
+        if change.kind == 'daily' and not self.reminder_list.stale:
+            if self.searching():
+                self.search_changed()
+            else:
+                self.reminder_list.update_reminder(change.reminder)
+
+    def reminder_removed(self, app, change):
+        if change.kind == 'daily' and not self.reminder_list.stale:
+            if self.searching():
+                self.search_changed()
+            else:
+                self.reminder_list.remove_reminder(change.reminder)
 
     def update_daily_reminders_display(self, *args):
-        """Update the reminders display."""
-        self.reminders_layout.clear_widgets()
-        # print(self.app.daily_reminders)
-        for index, reminder in enumerate(self.app.daily_reminders):
-            reminder_widget = ReminderWidget(
-                date=index,
-                reminder_text=reminder,
-                screen_width=self.width,
-                edit_callback=self.open_edit_daily_reminder_popup,
-                delete_callback=self.delete_daily_reminder
+        """Fill the reminder list if it has not been filled yet, with only the matches while searching."""
+        if self.reminder_list.stale:
+            self.showing_matches = self.searching()
+            if self.showing_matches:
+                reminders = self.app.search_reminders('daily', self.search_input.text)
+                positions = map(self.app.reminders.position, reminders)
+            else:
+                reminders = self.app.daily_reminders
+                # Each row shows its own position when drawn, so a delete moves none of them
+                positions = [None] * len(reminders)
+            self.reminder_list.set_rows(
+                {'key': reminder, 'date': position, 'reminder_text': reminder.text}
+                for position, reminder in zip(positions, reminders)
             )
-            self.reminders_layout.add_widget(reminder_widget)
 
     def add_daily_reminder(self, instance):
         """Add a new daily reminder."""
         new_reminder = self.new_daily_reminder.text.strip()
         if new_reminder:
-            self.app.daily_reminders.append(new_reminder)
-            self.app.save_reminders()  
+            self.app.add_daily_reminder(new_reminder)
             self.new_daily_reminder.text = ""
-            self.update_daily_reminders_display()
             self.fade_error_message()
         else:
             self.error_label.text = "Reminder text cannot be empty."
             self.fade_error_message()
 
-    def delete_daily_reminder(self, index):
-        """Delete a daily reminder by index."""
-        if 0 <= index < len(self.app.daily_reminders):
-            del self.app.daily_reminders[index]
-            self.app.save_reminders()  
-            self.update_daily_reminders_display()
-            self.fade_error_message()
+    def delete_daily_reminder(self, reminder):
+        """Delete a daily reminder."""
+        self.app.remove_reminder(reminder)
+        self.fade_error_message()
 
-    def open_edit_daily_reminder_popup(self, index, current_reminder):
+    def open_edit_daily_reminder_popup(self, reminder, current_reminder):
         """Open a popup to edit a daily reminder."""
         content = BoxLayout(orientation='vertical', spacing=10)
         input_text = TextInput(text=current_reminder, multiline=False, size_hint=(1, None), height=60)
@@ -355,16 +793,14 @@ class DailyRemindersScreen(Screen):
         content.add_widget(save_button)
 
         popup = Popup(title="Edit Reminder", content=content, size_hint=(None, None), size=(400, 200))
-        save_button.bind(on_press=lambda btn: self.save_edited_daily_reminder(index, input_text.text, popup))
+        save_button.bind(on_press=lambda btn: self.save_edited_daily_reminder(reminder, input_text.text, popup))
         popup.open()
 
-    def save_edited_daily_reminder(self, index, new_text, popup):
+    def save_edited_daily_reminder(self, reminder, new_text, popup):
         """Save the edited daily reminder."""
         new_text = new_text.strip()
-        if new_text and 0 <= index < len(self.app.daily_reminders):
-            self.app.daily_reminders[index] = new_text
-            self.app.save_reminders()  
-            self.update_daily_reminders_display()
+        if new_text:
+            self.app.edit_reminder(reminder, new_text)
             self.fade_error_message()
             popup.dismiss()
         else:
@@ -384,7 +820,7 @@ class DailyRemindersScreen(Screen):
 
 
 class SpecificRemindersScreen(Screen):
-    scroll_view = ObjectProperty(None)
+    reminder_list = ObjectProperty(None)
 
     def __init__(self, app, **kwargs):
         super().__init__(**kwargs)
@@ -394,11 +830,18 @@ class SpecificRemindersScreen(Screen):
         self.error_label = Label(text="", color=get_color_from_hex('#FF0000'), size_hint_y=None, height=30)
         layout.add_widget(self.error_label)
 
-        self.scroll_view = ScrollView()
-        self.reminders_layout = BoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None)
-        self.reminders_layout.bind(minimum_height=self.reminders_layout.setter('height'))
-        self.scroll_view.add_widget(self.reminders_layout)
-        layout.add_widget(self.scroll_view)
+        self.search_input = TextInput(hint_text="Search", multiline=False, size_hint_y=None, height=40)
+        self.search_input.bind(text=self.query_changed)
+        layout.add_widget(self.search_input)
+        # Whether the list holds search results rather than every reminder
+        self.showing_matches = False
+
+        self.reminder_list = ReminderList(
+            edit_callback=self.edit_reminder,
+            delete_callback=self.delete_specific_reminder
+        )
+        self.reminder_list.bind(scroll_y=self.list_scrolled)
+        layout.add_widget(self.reminder_list)
 
         layout.add_widget(Label(size_hint_y=None, height=10))  # Spacer
 
@@ -417,15 +860,77 @@ class SpecificRemindersScreen(Screen):
         layout.add_widget(back_button)
 
         self.add_widget(layout)
-        self.current_editing_date = None
-        self.bind(size=self.update_reminder_widths)
+        self.current_editing_key = None
+        # Reminders before this date are not listed until the user scrolls back to them
+        self.shown_from = None
+        self.refresh_trigger = Clock.create_trigger(self.update_specific_reminders_display)
         self.bind(on_enter=self.update_specific_reminders_display)
+        self.app.bind(
+            on_reminder_added=self.reminder_added,
+            on_reminder_updated=self.reminder_updated,
+            on_reminder_removed=self.reminder_removed,
+            on_reminders_reset=self.reset_reminders_display
+        )
 
-    def update_reminder_widths(self, *args):
-        """Update the text_size of all reminder labels when screen size changes."""
-        for child in self.reminders_layout.children:
-            if isinstance(child, ReminderWidget):
-                child.label.text_size = (self.width * 0.65 - dp(20), None)
+    def reset_reminders_display(self, *args):
+        self.reminder_list.stale = True
+        if self.manager and self.manager.current_screen is self:
+            self.refresh_trigger()
+
+    def searching(self):
+        return bool(query_words(self.search_input.text))
+
+    def query_changed(self, *args):
+        # A first letter is too short to search by, and the list already shows everything
+        if self.searching() or self.showing_matches:
+            self.search_changed()
+
+    def search_changed(self, *args):
+        # Keystrokes within one frame share a single search
+        self.reminder_list.stale = True
+        self.refresh_trigger()
+
+    def shows(self, change):
+        """Whether the changed reminder is one the list is showing or should show."""
+        return (change.kind == 'specific' and not self.reminder_list.stale
+                and (self.shown_from is None or change.reminder.date >= self.shown_from))
+
+    def reminder_added(self, app, change):
+        if self.shows(change):
+            if self.searching():
+                self.search_changed()
+            else:
+                self.reminder_list.insert_reminder(change.reminder)
+
+    def reminder_updated(self, app, change):
+        if self.shows(change):
+            if self.searching():
+                self.search_changed()
+            else:
+                self.reminder_list.update_reminder(change.reminder)
+
+    def reminder_removed(self, app, change):
+        if self.shows(change):
+            if self.searching():
+                self.search_changed()
+            else:
+                self.reminder_list.remove_reminder(change.reminder)
+
+    def list_scrolled(self, reminder_list, scroll_y):
+        # Pulling the list down past its top brings in the month before
+        if scroll_y > 1 and self.shown_from is not None and not self.searching() and not reminder_list.stale:
+            self.show_earlier()
+
+    def show_earlier(self):
+        shown = len(self.reminder_list.data)
+        if not self.app.reminders.load_earlier():
+            return
+        self.reminder_list.stale = True
+        self.update_specific_reminders_display()
+        total = len(self.reminder_list.data)
+        if total:
+            # Keep the rows that were at the top in view below the ones just added
+            self.reminder_list.scroll_y = shown / total
 
     def add_specific_reminder(self, instance):
         """Add a new reminder."""
@@ -436,30 +941,21 @@ class SpecificRemindersScreen(Screen):
                  # Parse the date input to validate and normalize to  YYYY-MM-DD  format
                 parsed_date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
                 normalized_date = parsed_date.strftime('%Y-%m-%d')
-                reminder_widget = ReminderWidget(
-                    date=normalized_date,
-                    reminder_text=reminder_text,
-                    screen_width=self.width,
-                    edit_callback=self.edit_reminder,
-                    delete_callback=self.delete_specific_reminder
-                )
-                self.reminders_layout.add_widget(reminder_widget)
                 self.new_specific_date.text = ""
                 self.new_specific_reminder.text = ""
-                self.app.specific_date_reminders[normalized_date] = reminder_text
-                self.update_specific_reminders_display()
-                self.app.save_reminders()  # Save after adding
-                self.app.main_screen.update_reminders_display()  # Update main screen
+                self.app.add_specific_reminder(normalized_date, reminder_text)
                 self.fade_error_message()
             except ValueError:
-                self.error_label.text = "Invalid date format. Please use<ctrl98>-MM-DD."
+                self.error_label.text = "Invalid date format. Please use YYYY-MM-DD."
                 self.fade_error_message()
         else:
             self.error_label.text = "Please enter both date and reminder text."
             self.fade_error_message()
 
-    def edit_reminder(self, date, current_reminder):
-        self.current_editing_date = date
+    def edit_reminder(self, reminder, current_reminder):
+        """Open a popup to edit a specific reminder."""
+        self.current_editing_key = reminder
+        date = reminder.date
         content = BoxLayout(orientation='vertical', spacing=10)
         date_label = Label(text=f"Date: {date}")
         input_text = TextInput(text=current_reminder, multiline=False, size_hint=(1, None), height=60)
@@ -474,42 +970,41 @@ class SpecificRemindersScreen(Screen):
     
     def save_edited_specific_reminder(self, new_text, popup):
         new_text = new_text.strip()
-        if new_text and self.current_editing_date in self.app.specific_date_reminders:
-            self.app.specific_date_reminders[self.current_editing_date] = new_text
-            self.app.save_reminders()  
-            self.update_specific_reminders_display()
-            self.app.main_screen.update_reminders_display()  # Update main screen
+        if new_text and self.current_editing_key is not None:
+            self.app.edit_reminder(self.current_editing_key, new_text)
             self.fade_error_message()
         else:
             self.error_label.text = "Reminder text cannot be empty."
             self.fade_error_message()
         if popup:
             popup.dismiss()
-        self.current_editing_date = None
-
-    def delete_specific_reminder(self, date):
-        if date in self.app.specific_date_reminders:
-            del self.app.specific_date_reminders[date]
-            self.app.save_reminders()  
-            self.update_specific_reminders_display()
-            self.app.main_screen.update_reminders_display()  # Update main screen
-            self.fade_error_message()
-        
+        self.current_editing_key = None
+
+    def delete_specific_reminder(self, reminder):
+        self.app.remove_reminder(reminder)
+        self.fade_error_message()
+
 
     def update_specific_reminders_display(self, *args):
-        """Update the reminders display."""
-        self.reminders_layout.clear_widgets()
-        # print(self.app.specific_date_reminders)
-        for date, reminder_text in self.app.specific_date_reminders.items():
-            reminder_widget = ReminderWidget(
-                date=date,
-                reminder_text=reminder_text,
-                screen_width=self.width,
-                edit_callback=self.edit_reminder,
-                delete_callback=self.delete_specific_reminder
+        """Fill the reminder list if it has not been filled yet, with only the matches while searching."""
+        if self.reminder_list.stale:
+            self.showing_matches = self.searching()
+            if self.showing_matches:
+                # Searching reads every month, so the whole history is in memory afterwards
+                reminders = self.app.search_reminders('specific', self.search_input.text)
+                self.shown_from = self.app.reminders.loaded_from
+            else:
+                self.shown_from = self.app.reminders.loaded_from
+                reminders = (
+                    reminder
+                    for date, date_reminders in self.app.reminders_between(self.shown_from)
+                    for reminder in date_reminders
+                )
+            self.reminder_list.set_rows(
+                {'key': reminder, 'date': reminder.date, 'reminder_text': reminder.text}
+                for reminder in reminders
             )
-            self.reminders_layout.add_widget(reminder_widget)
-    
+
     def fade_error_message(self):
         anim = Animation(opacity=0, duration=3)
         anim.start(self.error_label)
@@ -519,5 +1014,326 @@ class SpecificRemindersScreen(Screen):
         self.error_label.opacity = 1
         self.error_label.text = ""
 
+class RecurringRemindersScreen(Screen):
+    reminder_list = ObjectProperty(None)
+
+    def __init__(self, app, **kwargs):
+        super().__init__(**kwargs)
+        self.app = app
+        layout = BoxLayout(orientation='vertical', padding=10)
+
+        self.error_label = Label(text="", color=get_color_from_hex('#FF0000'), size_hint_y=None, height=30)
+        layout.add_widget(self.error_label)
+
+        self.reminder_list = ReminderList(
+            edit_callback=self.open_edit_recurring_reminder_popup,
+            delete_callback=self.delete_recurring_reminder
+        )
+        layout.add_widget(self.reminder_list)
+
+        layout.add_widget(Label(size_hint_y=None, height=10))  # Spacer
+
+        add_layout = BoxLayout(size_hint_y=None, height=80, spacing=10)
+        self.new_recurring_rule = TextInput(hint_text="weekly mon,wed 09:00", multiline=False)
+        self.new_recurring_reminder = TextInput(hint_text="Reminder text", multiline=False)
+        add_button = Button(text="Add")
+        add_button.bind(on_press=self.add_recurring_reminder)
+        add_layout.add_widget(self.new_recurring_rule)
+        add_layout.add_widget(self.new_recurring_reminder)
+        add_layout.add_widget(add_button)
+        layout.add_widget(add_layout)
+
+        back_button = Button(text="Back to Main", size_hint_y=None, height=50)
+        back_button.bind(on_press=lambda x: self.manager.switch_to(self.app.main_screen))
+        layout.add_widget(back_button)
+
+        self.add_widget(layout)
+        self.bind(on_enter=self.update_recurring_reminders_display)
+        self.app.bind(
+            on_reminder_added=self.reminder_added,
+            on_reminder_updated=self.reminder_updated,
+            on_reminder_removed=self.reminder_removed,
+            on_reminders_reset=self.reset_reminders_display
+        )
+
+    def reset_reminders_display(self, *args):
+        self.reminder_list.stale = True
+        if self.manager and self.manager.current_screen is self:
+            self.update_recurring_reminders_display()
+
+    def reminder_added(self, app, change):
+        if change.kind == 'recurring' and not self.reminder_list.stale:
+            self.reminder_list.insert_reminder(change.reminder, date=change.reminder.rule)
+
+    def reminder_updated(self, app, change):
+        if change.kind == 'recurring' and not self.reminder_list.stale:
+            self.reminder_list.update_reminder(change.reminder, date=change.reminder.rule)
+
+    def reminder_removed(self, app, change):
+        if change.kind == 'recurring' and not self.reminder_list.stale:
+            self.reminder_list.remove_reminder(change.reminder)
+
+    def update_recurring_reminders_display(self, *args):
+        """Fill the reminder list if it has not been filled yet."""
+        if self.reminder_list.stale:
+            self.reminder_list.set_rows(
+                {'key': reminder, 'date': reminder.rule, 'reminder_text': reminder.text}
+                for reminder in self.app.recurring_reminders
+            )
+
+    def normalize_rule(self, rule_text):
+        """Validate a rule and return it in canonical form, or None after showing the error."""
+        try:
+            return parse_rule(rule_text).describe()
+        except ValueError as e:
+            self.error_label.text = f"Invalid rule: {e}"
+            self.fade_error_message()
+            return None
+
+    def add_recurring_reminder(self, instance):
+        """Add a new recurring reminder."""
+        rule_text = self.new_recurring_rule.text.strip()
+        reminder_text = self.new_recurring_reminder.text.strip()
+        if not (rule_text and reminder_text):
+            self.error_label.text = "Please enter both a rule and reminder text."
+            self.fade_error_message()
+            return
+        rule = self.normalize_rule(rule_text)
+        if rule:
+            self.new_recurring_rule.text = ""
+            self.new_recurring_reminder.text = ""
+            self.app.add_recurring_reminder(reminder_text, rule)
+            self.fade_error_message()
+
+    def delete_recurring_reminder(self, reminder):
+        self.app.remove_reminder(reminder)
+        self.fade_error_message()
+
+    def open_edit_recurring_reminder_popup(self, reminder, current_reminder):
+        """Open a popup to edit the text and rule of a recurring reminder."""
+        content = BoxLayout(orientation='vertical', spacing=10)
+        input_rule = TextInput(text=reminder.rule, multiline=False,
+                               size_hint=(1, None), height=60)
+        input_text = TextInput(text=current_reminder, multiline=False, size_hint=(1, None), height=60)
+        save_button = Button(text="Save", size_hint_y=None, height=50)
+        content.add_widget(input_rule)
+        content.add_widget(input_text)
+        content.add_widget(save_button)
+
+        popup = Popup(title="Edit Recurring Reminder", content=content, size_hint=(None, None), size=(400, 270))
+        save_button.bind(on_press=lambda btn: self.save_edited_recurring_reminder(
+            reminder, input_text.text, input_rule.text, popup))
+        popup.open()
+
+    def save_edited_recurring_reminder(self, reminder, new_text, rule_text, popup):
+        new_text = new_text.strip()
+        if not new_text:
+            self.error_label.text = "Reminder text cannot be empty."
+            self.fade_error_message()
+            return
+        rule = self.normalize_rule(rule_text)
+        if rule:
+            self.app.edit_reminder(reminder, new_text, rule)
+            self.fade_error_message()
+            popup.dismiss()
+
+    def fade_error_message(self):
+        anim = Animation(opacity=0, duration=3)
+        anim.start(self.error_label)
+        Clock.schedule_once(self.reset_error_opacity, 3)
+
+    def reset_error_opacity(self, dt):
+        self.error_label.opacity = 1
+        self.error_label.text = ""
+
+
+class PerformanceScreen(Screen):
+    """Debug screen with the timings and counters recorded by reminder_core.perf.
+
+    The numbers refresh every second while the screen is shown. Export appends
+    a JSON snapshot to perf.jsonl next to the reminders file.
+    """
+    def __init__(self, app, **kwargs):
+        super().__init__(**kwargs)
+        self.app = app
+        self.refresh_event = None
+        layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+
+        self.status_label = Label(text="", size_hint_y=None, height=30)
+        layout.add_widget(self.status_label)
+
+        scroll = ScrollView()
+        self.stats_label = Label(font_name='RobotoMono-Regular', font_size=12, halign='left', valign='top',
+                                 size_hint_y=None)
+        self.stats_label.bind(width=lambda label, width: setattr(label, 'text_size', (width, None)))
+        self.stats_label.bind(texture_size=lambda label, size: setattr(label, 'height', size[1]))
+        scroll.add_widget(self.stats_label)
+        layout.add_widget(scroll)
+
+        buttons = BoxLayout(size_hint_y=None, height=50, spacing=10)
+        self.record_button = Button()
+        self.record_button.bind(on_press=self.toggle_recording)
+        reset_button = Button(text="Reset")
+        reset_button.bind(on_press=lambda x: (perf.reset(), self.refresh()))
+        export_button = Button(text="Export")
+        export_button.bind(on_press=self.export)
+        buttons.add_widget(self.record_button)
+        buttons.add_widget(reset_button)
+        buttons.add_widget(export_button)
+        layout.add_widget(buttons)
+
+        back_button = Button(text="Back to Main", size_hint_y=None, height=50)
+        back_button.bind(on_press=lambda x: self.manager.switch_to(self.app.main_screen))
+        layout.add_widget(back_button)
+
+        self.add_widget(layout)
+        self.bind(on_enter=self.start_refreshing, on_leave=self.stop_refreshing)
+
+    def start_refreshing(self, *args):
+        self.refresh()
+        self.refresh_event = Clock.schedule_interval(self.refresh, 1)
+
+    def stop_refreshing(self, *args):
+        if self.refresh_event is not None:
+            self.refresh_event.cancel()
+            self.refresh_event = None
+
+    def refresh(self, *args):
+        self.record_button.text = "Stop recording" if perf.enabled else "Start recording"
+        snapshot = perf.snapshot()
+        lines = [f"FPS {Clock.get_fps():.0f}", "", f"{'':<24}{'calls':>7}{'mean ms':>9}{'max ms':>9}"]
+        for name, stat in snapshot["timings"].items():
+            lines.append(f"{name:<24}{stat['count']:>7}{stat['mean_ms']:>9.2f}{stat['max_ms']:>9.2f}")
+        if snapshot["counters"]:
+            lines.append("")
+            lines.extend(f"{name:<24}{value:>7}" for name, value in snapshot["counters"].items())
+        if snapshot["slow_calls"]:
+            lines.extend(["", "Slowest recent calls:"])
+            for call in sorted(snapshot["slow_calls"], key=lambda call: call["ms"], reverse=True)[:10]:
+                lines.append(f"{call['name']:<24}{call['ms']:>9.1f} ms")
+        self.stats_label.text = "\n".join(lines)
+
+    def toggle_recording(self, *args):
+        perf.enable(not perf.enabled)
+        self.refresh()
+
+    def export(self, *args):
+        path = os.path.join(os.path.dirname(self.app.store.path), "perf.jsonl")
+        try:
+            perf.export(path)
+            self.status_label.text = f"Exported to {path}"
+        except OSError as e:
+            self.status_label.text = f"Export failed: {e}"
+
+
+class TransferScreen(Screen):
+    """Import reminders from, or export them to, a .csv, .ics, .json or .jsonl file.
+
+    A relative path is taken to be next to the reminders file. Files are
+    parsed and written on a worker thread with the progress shown on the
+    bar; the parsed reminders are then added on the main thread in one batch.
+    """
+    def __init__(self, app, **kwargs):
+        super().__init__(**kwargs)
+        self.app = app
+        self.busy = False
+        layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+
+        self.path_input = TextInput(hint_text="File, e.g. reminders.csv or calendar.ics", multiline=False,
+                                    size_hint_y=None, height=50)
+        layout.add_widget(self.path_input)
+
+        buttons = BoxLayout(size_hint_y=None, height=50, spacing=10)
+        import_button = Button(text="Import")
+        import_button.bind(on_press=self.start_import)
+        export_button = Button(text="Export")
+        export_button.bind(on_press=self.start_export)
+        buttons.add_widget(import_button)
+        buttons.add_widget(export_button)
+        layout.add_widget(buttons)
+
+        self.progress_bar = ProgressBar(max=1, value=0, size_hint_y=None, height=30)
+        layout.add_widget(self.progress_bar)
+
+        self.status_label = Label(text="", halign='left', valign='top')
+        self.status_label.bind(size=self.status_label.setter('text_size'))
+        layout.add_widget(self.status_label)
+
+        back_button = Button(text="Back to Main", size_hint_y=None, height=50)
+        back_button.bind(on_press=lambda x: self.manager.switch_to(self.app.main_screen))
+        layout.add_widget(back_button)
+
+        self.add_widget(layout)
+
+    def file_path(self):
+        path = os.path.expanduser(self.path_input.text.strip())
+        if not path:
+            self.status_label.text = "Enter a file name first."
+            return None
+        return os.path.join(os.path.dirname(self.app.store.path), path)
+
+    def start_import(self, *args):
+        path = self.file_path()
+        if path is None or self.busy:
+            return
+        self.busy = True
+        self.progress_bar.value = 0
+        self.status_label.text = f"Reading {path}..."
+        threading.Thread(target=self.read_file, args=(path,), daemon=True).start()
+
+    def read_file(self, path):
+        """Worker thread: parse and check the file, then hand the result to the main thread."""
+        parsed, message = None, "Import failed."
+        try:
+            parsed = parse_file(path, progress=self.report_progress)
+        except (OSError, ValueError) as e:
+            message = f"Import failed: {e}"
+        finally:
+            # Also after an unexpected error, so the screen does not stay busy
+            Clock.schedule_once(lambda dt: self.finish(message) if parsed is None else self.add_parsed(parsed))
+
+    def report_progress(self, fraction):
+        Clock.schedule_once(lambda dt: setattr(self.progress_bar, 'value', fraction))
+
+    def add_parsed(self, parsed):
+        if not self.app.import_reminders(parsed.items):
+            self.finish("Import failed.")
+            return
+        lines = [f"Imported {len(parsed.items)} reminders."]
+        if parsed.skipped:
+            lines.append(f"Skipped {parsed.skipped}:")
+            lines.extend(parsed.errors)
+        self.finish("\n".join(lines))
+
+    def start_export(self, *args):
+        path = self.file_path()
+        if path is None or self.busy:
+            return
+        if os.path.exists(path):
+            self.status_label.text = f"{path} already exists."
+            return
+        self.busy = True
+        self.progress_bar.value = 0
+        self.status_label.text = f"Writing {path}..."
+        # Taken on the main thread, which the store belongs to; the file is written on a worker
+        items = list(reminder_items(self.app.store))
+        threading.Thread(target=self.write_file, args=(items, path), daemon=True).start()
+
+    def write_file(self, items, path):
+        message = "Export failed."
+        try:
+            message = f"Exported {export_file(items, path)} reminders to {path}"
+        except (OSError, ValueError) as e:
+            message = f"Export failed: {e}"
+        finally:
+            # Also after an unexpected error, so the screen does not stay busy
+            Clock.schedule_once(lambda dt: self.finish(message))
+
+    def finish(self, message):
+        self.busy = False
+        self.progress_bar.value = self.progress_bar.max
+        self.status_label.text = message
+
+
 if __name__ == '__main__':
     ReminderApp().run()
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""Reminder model, storage and scheduling without any UI.
+
+Nothing in this package imports Kivy or plyer. The Kivy app in main.py is one
+front end; ``python -m reminder_core`` is another.
+"""
+from .model import Reminder, Reminders, ReminderChange
+from .storage import open_store
@@ -0,0 +1,234 @@
+"""Command line front end: manage reminders or run the notification scheduler headless.
+
+    python -m reminder_core list
+    python -m reminder_core add-daily "Drink water"
+    python -m reminder_core add 2025-06-01 "Dentist"
+    python -m reminder_core add-recurring "weekly mon,wed 09:00" "Gym"
+    python -m reminder_core remove specific 2025-06-01 0
+    python -m reminder_core search daily water
+    python -m reminder_core upcoming --days 7
+    python -m reminder_core weight 0 3
+    python -m reminder_core run --per-day 3
+    python -m reminder_core convert reminders.snap
+    python -m reminder_core import calendar.ics
+    python -m reminder_core export backup.csv
+"""
+import os
+import sys
+import argparse
+import datetime
+from . import Reminders, open_store
+from .clock import LoopClock
+from .recurrence import parse_rule, expand
+from .scheduler import ReminderScheduler
+from .search import MIN_PREFIX, query_words
+from .selection import ShuffleBag, selection_path
+from .dispatch import NotificationDispatcher
+from .snapshot import write_binary
+from .storage import write_atomic, write_shards
+from .transfer import parse_file, export_file, reminder_items
+
+
+def print_reminders(reminders, args):
+    for index, reminder in enumerate(reminders.daily_reminders):
+        print(f"daily {index}: {reminder.text}")
+    for index, reminder in enumerate(reminders.recurring_reminders):
+        print(f"recurring {index}: {reminder.text} ({reminder.rule})")
+    for date, date_reminders in reminders.reminders_between():
+        for position, reminder in enumerate(date_reminders):
+            print(f"specific {date} {position}: {reminder.text}")
+
+
+def add_daily(reminders, args):
+    reminders.add_daily(args.text)
+
+
+def add_specific(reminders, args):
+    date = datetime.datetime.strptime(args.date, '%Y-%m-%d').date()
+    reminders.add_specific(date.strftime('%Y-%m-%d'), args.text)
+
+
+def add_recurring(reminders, args):
+    reminders.add_recurring(args.text, parse_rule(args.rule).describe())
+
+
+def remove(reminders, args):
+    if args.kind == 'daily':
+        reminder = reminders.daily_reminders[int(args.where[0])]
+    elif args.kind == 'recurring':
+        reminder = reminders.recurring_reminders[int(args.where[0])]
+    else:
+        date, position = args.where
+        reminder = reminders.reminders_on(date)[int(position)]
+    reminders.delete(reminder)
+
+
+def search(reminders, args):
+    if not query_words(" ".join(args.query)):
+        raise ValueError(f"search words need at least {MIN_PREFIX} letters")
+    for reminder in reminders.search(args.kind, " ".join(args.query)):
+        where = reminders.position(reminder)
+        if args.kind == 'specific':
+            where = f"{reminder.date} {where}"
+        print(f"{args.kind} {where}: {reminder.text}")
+
+
+def upcoming(reminders, args):
+    today = datetime.date.today()
+    end = today + datetime.timedelta(days=args.days)
+    for date, date_reminders in reminders.reminders_between(today.isoformat(), end.isoformat()):
+        for reminder in date_reminders:
+            print(f"{date}: {reminder.text}")
+    start = datetime.datetime.now()
+    items = [(parse_rule(reminder.rule), reminder.text) for reminder in reminders.recurring_reminders]
+    for occurrence, text in expand(items, start, datetime.datetime.combine(end, datetime.time())):
+        print(f"{occurrence:%Y-%m-%d %H:%M}: {text}")
+
+
+def set_weight(reminders, args):
+    text = reminders.daily_reminders[args.index].text
+    ShuffleBag(selection_path(args.file)).set_weight(text, args.weight)
+
+
+# Seconds between checks for changes made by the app or another command
+POLL_INTERVAL = 5
+
+
+def notify(title, message):
+    print(f"{datetime.datetime.now():%Y-%m-%d %H:%M} {title}: {message}", flush=True)
+
+
+def run(reminders, args):
+    clock = LoopClock()
+    dispatcher = NotificationDispatcher(notify)
+    scheduler = ReminderScheduler(reminders.store, clock, dispatcher.dispatch, daily_count=args.per_day,
+                                  bag=ShuffleBag(selection_path(args.file)))
+
+    def reminders_changed(event, change):
+        if change is not None:
+            scheduler.reminders_changed(change)
+        else:
+            scheduler.reminders_reset()
+
+    def poll(dt):
+        try:
+            if not reminders.refresh():
+                reminders.load()
+        except (ValueError, OSError) as e:
+            print(f"Error reading changes to {args.file}: {e}", file=sys.stderr)
+        clock.schedule_once(poll, POLL_INTERVAL)
+
+    reminders.subscribe(reminders_changed)
+    scheduler.start()
+    clock.schedule_once(poll, POLL_INTERVAL)
+    try:
+        clock.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        dispatcher.stop()
+
+
+def convert(reminders, args):
+    """Write every reminder to a new JSON (.json) or binary (.snap) snapshot, or a sharded (.shards) directory."""
+    extension = os.path.splitext(args.target)[1]
+    if extension not in (".json", ".snap", ".shards"):
+        raise ValueError("convert writes .json or .snap files or .shards directories")
+    if os.path.exists(args.target):
+        raise ValueError(f"{args.target} already exists")
+    # A journal left next to the target would be replayed on top of the copy
+    journal_path = getattr(open_store(args.target), "journal_path", None)
+    if journal_path is not None and os.path.exists(journal_path):
+        raise ValueError(f"{journal_path} already exists")
+    store = reminders.store
+    data = {
+        "specific_date_reminders": dict(store.reminders_between()),
+        "daily_reminders": list(store.daily_reminders),
+        "recurring_reminders": list(store.recurring_reminders)
+    }
+    if extension == ".snap":
+        write_binary(args.target, data, args.compress)
+    elif extension == ".shards":
+        write_shards(args.target, data)
+    else:
+        write_atomic(args.target, data)
+
+
+def import_file(reminders, args):
+    parsed = parse_file(args.source)
+    for error in parsed.errors:
+        print(f"Skipped {error}", file=sys.stderr)
+    if parsed.skipped > len(parsed.errors):
+        print(f"Skipped {parsed.skipped - len(parsed.errors)} more", file=sys.stderr)
+    print(f"Imported {reminders.add_many(parsed.items)} reminders")
+
+
+def export(reminders, args):
+    if os.path.exists(args.target):
+        raise ValueError(f"{args.target} already exists")
+    print(f"Exported {export_file(reminder_items(reminders.store), args.target)} reminders")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m reminder_core", description="Manage reminders without the UI.")
+    parser.add_argument("-f", "--file", default="reminders.json",
+                        help="reminder file; a .db or .sqlite file uses the SQLite backend and a "
+                             ".shards directory keeps one file per month")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="print every reminder").set_defaults(handler=print_reminders)
+    command = commands.add_parser("add-daily", help="add a daily reminder")
+    command.add_argument("text")
+    command.set_defaults(handler=add_daily)
+    command = commands.add_parser("add", help="add a reminder for a date")
+    command.add_argument("date", help="YYYY-MM-DD")
+    command.add_argument("text")
+    command.set_defaults(handler=add_specific)
+    command = commands.add_parser("add-recurring", help="add a recurring reminder")
+    command.add_argument("rule", help='e.g. "weekly mon,wed 09:00" or "every 3 days 08:30"')
+    command.add_argument("text")
+    command.set_defaults(handler=add_recurring)
+    command = commands.add_parser("remove", help="remove a reminder by the key 'list' shows")
+    command.add_argument("kind", choices=('daily', 'recurring', 'specific'))
+    command.add_argument("where", nargs='+', help="INDEX, or DATE POSITION for specific reminders")
+    command.set_defaults(handler=remove)
+    command = commands.add_parser("search", help="find reminders by the start of their words")
+    command.add_argument("kind", choices=('daily', 'specific'))
+    command.add_argument("query", nargs='+')
+    command.set_defaults(handler=search)
+    command = commands.add_parser("upcoming", help="print dated and recurring reminders coming up")
+    command.add_argument("--days", type=int, default=7)
+    command.set_defaults(handler=upcoming)
+    command = commands.add_parser("weight", help="set how often a daily reminder comes up in each round")
+    command.add_argument("index", type=int, help="INDEX as 'list' shows it")
+    command.add_argument("weight", type=int)
+    command.set_defaults(handler=set_weight)
+    command = commands.add_parser("run", help="send notifications until interrupted")
+    command.add_argument("--per-day", type=int, default=1, help="daily reminders to send each day")
+    command.set_defaults(handler=run)
+    command = commands.add_parser("convert", help="copy the reminders to a new .json, .snap or .shards store")
+    command.add_argument("target")
+    command.add_argument("--compress", action="store_true", help="compress a .snap file")
+    command.set_defaults(handler=convert)
+    command = commands.add_parser("import", help="add the reminders in a .csv, .ics, .json or .jsonl file")
+    command.add_argument("source")
+    command.set_defaults(handler=import_file)
+    command = commands.add_parser("export", help="write the reminders to a new .csv, .ics, .json or .jsonl file")
+    command.add_argument("target")
+    command.set_defaults(handler=export)
+    args = parser.parse_args(argv)
+
+    reminders = Reminders(open_store(args.file))
+    try:
+        reminders.load()
+        args.handler(reminders, args)
+    except (ValueError, IndexError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        reminders.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
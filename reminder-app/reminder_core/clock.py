@@ -0,0 +1,131 @@
+import time
+import heapq
+import datetime
+import itertools
+
+# Longest single sleep, so a wall clock that jumped (e.g. after a suspend) is noticed
+MAX_SLEEP = 60
+
+
+class ClockEvent:
+    def __init__(self, callback, scheduled_at, due):
+        self.callback = callback
+        self.scheduled_at = scheduled_at
+        self.due = due
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class LoopClock:
+    """Stand-in for Kivy's Clock when the scheduler runs without a UI.
+
+    It offers the part of Kivy's Clock the scheduler uses: schedule_once()
+    returns an event with cancel(), and the callback gets the seconds elapsed
+    since it was scheduled. run() calls the callbacks on the calling thread.
+    """
+    def __init__(self):
+        self.events = []
+        self.counter = itertools.count()
+        self.time = time.time
+
+    def schedule_once(self, callback, timeout=0):
+        now = self.time()
+        event = ClockEvent(callback, now, now + timeout)
+        heapq.heappush(self.events, (event.due, next(self.counter), event))
+        return event
+
+    def run(self):
+        """Call events as they come due until none are left."""
+        while self.events:
+            due, _, event = self.events[0]
+            if event.cancelled:
+                heapq.heappop(self.events)
+                continue
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(min(delay, MAX_SLEEP))
+                continue
+            heapq.heappop(self.events)
+            event.callback(time.time() - event.scheduled_at)
+
+
+class ManualClock(LoopClock):
+    """Clock whose time only moves when advance() is called, for tests.
+
+    Pass it as the clock and its now() as the time source, e.g.
+    DayClock(clock, clock.now) or ReminderScheduler(store, clock, notify, now=clock.now).
+    """
+    def __init__(self, start):
+        super().__init__()
+        self.current = start
+        self.time = lambda: self.current.timestamp()
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds=0, **kwargs):
+        """Move time forward by seconds (or timedelta keyword arguments), calling events as they come due."""
+        target = self.current + datetime.timedelta(seconds=seconds, **kwargs)
+        while self.events:
+            due, _, event = self.events[0]
+            if event.cancelled:
+                heapq.heappop(self.events)
+                continue
+            if due > target.timestamp():
+                break
+            heapq.heappop(self.events)
+            self.current = max(self.current, datetime.datetime.fromtimestamp(due))
+            event.callback(self.time() - event.scheduled_at)
+        self.current = target
+
+
+class DayClock:
+    """Today's date, shared by everything that needs it, with an event when it changes.
+
+    key is today as "%Y-%m-%d", worked out once a day instead of on every
+    use. Listeners added with subscribe() are called with the new date by a
+    single timer set for local midnight, which is only armed while there are
+    listeners. The timer may wake early or, after the device slept, late;
+    check() catches up either way and can also be called directly, e.g. when
+    the app resumes.
+    """
+    def __init__(self, clock, now=datetime.datetime.now):
+        self.clock = clock
+        self.now = now
+        self.listeners = []
+        self.event = None
+        self.set_today(now().date())
+
+    def set_today(self, day):
+        self.today = day
+        self.key = day.strftime("%Y-%m-%d")
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        if self.event is None:
+            self.arm()
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+        if not self.listeners and self.event is not None:
+            self.event.cancel()
+            self.event = None
+
+    def arm(self):
+        midnight = datetime.datetime.combine(self.today + datetime.timedelta(days=1), datetime.time())
+        self.event = self.clock.schedule_once(self.check, max((midnight - self.now()).total_seconds(), 0))
+
+    def check(self, *args):
+        """Tell the listeners if the date has changed, and re-arm the timer for the next midnight."""
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+        day = self.now().date()
+        if day != self.today:
+            self.set_today(day)
+            for listener in list(self.listeners):
+                listener(day)
+        if self.listeners and self.event is None:
+            self.arm()
@@ -0,0 +1,79 @@
+import time
+import threading
+from . import perf
+
+
+def summarize(batch, max_lines=5):
+    """Fold a batch of (title, message) notifications into one."""
+    if len(batch) == 1:
+        return batch[0]
+    lines = [message for title, message in batch[:max_lines]]
+    if len(batch) > max_lines:
+        lines.append(f"and {len(batch) - max_lines} more")
+    return f"{len(batch)} reminders", "\n".join(lines)
+
+
+class NotificationDispatcher:
+    """Sends notifications through a backend on a worker thread.
+
+    backend(title, message) does the sending, e.g. through plyer, and is
+    only ever called from the worker, so a slow backend never holds up the
+    caller. dispatch() queues a notification and returns at once. The worker
+    waits gather seconds after the first queued notification so the ones
+    falling due together go out together, and at least interval seconds
+    between sends; whatever is queued by then is summarized into a single
+    notification. on_sent(title, message) is called on the worker after each
+    send and a failed send is passed to on_error.
+    """
+    def __init__(self, backend, interval=10.0, gather=0.5, on_sent=None, on_error=None):
+        self.backend = backend
+        self.interval = interval
+        self.gather = gather
+        self.on_sent = on_sent
+        self.on_error = on_error or (lambda e: print(f"Error sending notification: {e}"))
+        self.condition = threading.Condition()
+        self.pending = []
+        self.first_queued = None
+        self.last_sent = None
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def dispatch(self, title, message):
+        with self.condition:
+            if not self.pending:
+                self.first_queued = time.monotonic()
+            self.pending.append((title, message))
+            self.condition.notify()
+
+    def due(self):
+        due = self.first_queued + self.gather
+        if self.last_sent is not None:
+            due = max(due, self.last_sent + self.interval)
+        return due
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and (not self.pending or time.monotonic() < self.due()):
+                    self.condition.wait(self.due() - time.monotonic() if self.pending else None)
+                if not self.pending:
+                    return
+                batch, self.pending = self.pending, []
+            perf.count("notifications.coalesced", len(batch) - 1)
+            title, message = summarize(batch)
+            try:
+                self.backend(title, message)
+            except Exception as e:
+                self.on_error(e)
+            else:
+                if self.on_sent is not None:
+                    self.on_sent(title, message)
+            self.last_sent = time.monotonic()
+
+    def stop(self):
+        """Send what is still queued, without waiting for the rate limit, and stop the worker."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def file_signature(path):
+    """Return (inode, size, mtime) of a file, or None if it does not exist.
+
+    Replacing or appending to the file changes it, so comparing signatures is
+    a cheap way to notice writes by other processes without reading the file.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class FileLock:
+    """Advisory lock on a file, shared by the threads of this process and other processes.
+
+    Every process writing a store takes the lock next to it, so writes never
+    interleave; programs that ignore it are not held back. acquire() waits
+    up to timeout seconds and then raises TimeoutError, or with
+    blocking=False returns False at once if the lock is taken.
+    """
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        # Keeps out the other threads of this process without polling, and guards fd
+        self.thread_lock = threading.Lock()
+        # Opened on first use and kept, as opening it costs about as much as locking it
+        self.fd = None
+
+    def acquire(self, blocking=True):
+        deadline = time.monotonic() + self.timeout
+        acquired = self.thread_lock.acquire(timeout=self.timeout) if blocking else self.thread_lock.acquire(False)
+        if not acquired:
+            if blocking:
+                raise TimeoutError(f"Timed out waiting for {self.path}")
+            return False
+        try:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        while not self.try_lock(self.fd):
+            if not blocking or time.monotonic() > deadline:
+                self.thread_lock.release()
+                if blocking:
+                    raise TimeoutError(f"{self.path} is held by another process")
+                return False
+            time.sleep(0.05)
+        return True
+
+    @staticmethod
+    def try_lock(fd):
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def release(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            self.thread_lock.release()
+
+    def close(self):
+        with self.thread_lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
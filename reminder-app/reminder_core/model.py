@@ -0,0 +1,285 @@
+import bisect
+import datetime
+from collections import namedtuple
+from operator import attrgetter
+from . import perf
+from .search import SearchIndex, query_words
+
+# Payload of the reminder change notifications. kind is 'daily', 'recurring'
+# or 'specific' and reminder is the Reminder that changed; a removed one is
+# no longer held by the model.
+ReminderChange = namedtuple('ReminderChange', ['kind', 'reminder'])
+
+
+class Reminder:
+    """One reminder as the model hands it out.
+
+    id is unique within the session and stays with the reminder however many
+    others are added or removed around it; it is not stored. ordinal is the
+    date of a specific reminder as a date ordinal and 0 for the others, so
+    order sorts reminders the way the screens list them. rule is the rule of
+    a recurring reminder.
+    """
+    __slots__ = ('id', 'kind', 'date', 'ordinal', 'text', 'rule')
+
+    def __init__(self, id, kind, text, date=None, rule=None):
+        self.id = id
+        self.kind = kind
+        self.text = text
+        self.date = date
+        self.ordinal = datetime.date.fromisoformat(date).toordinal() if date else 0
+        self.rule = rule
+
+    @property
+    def group(self):
+        """The list the reminder is kept in: its date, or its kind if it has none."""
+        return self.date if self.kind == 'specific' else self.kind
+
+    @property
+    def order(self):
+        return (self.ordinal, self.id)
+
+    def __repr__(self):
+        return f"Reminder({self.id}, {self.kind!r}, {self.text!r}, date={self.date!r}, rule={self.rule!r})"
+
+
+reminder_id = attrgetter('id')
+
+
+class Reminders:
+    """The reminders held in a store and the notifications about their changes.
+
+    The store keeps plain texts in lists, addressed by position. The model
+    hands them out as Reminder records, each group (the daily reminders, the
+    recurring ones, or the specific ones on a date) built on first use and
+    kept in a list sorted by id. Reminders are only ever appended to a group,
+    so a reminder's position in the store is found by bisecting the ids of
+    its group, and mutations take the Reminder itself rather than a position
+    that shifts when something before it is removed.
+
+    Every mutation goes through the store and is then announced to each
+    listener as listener(event, change), where event is 'added', 'updated' or
+    'removed' and change is a ReminderChange. 'reset' comes with no change
+    and means the reminders may differ in any way, e.g. after a reload or a
+    failed mutation, so listeners should start over from the store. Records
+    handed out before a reset no longer belong to the model.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.listeners = []
+        # Built on the first search of each kind and kept up to date by notify()
+        self.search_indexes = {}
+        self.groups = {}
+        # Ids are not reused after a reset, so a stale record never matches a new one
+        self.next_id = 1
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def notify(self, event, change=None):
+        if event == 'reset':
+            self.search_indexes = {}
+            self.groups = {}
+        elif change.kind in self.search_indexes:
+            index = self.search_indexes[change.kind]
+            if event == 'added':
+                index.add(change.reminder)
+            elif event == 'updated':
+                index.update(change.reminder)
+            else:
+                index.remove(change.reminder)
+        for listener in list(self.listeners):
+            listener(event, change)
+
+    def load(self):
+        self.store.load()
+        self.notify('reset')
+
+    def close(self):
+        self.store.close()
+
+    def refresh(self):
+        """Take in the changes other processes made to the store, announcing each.
+
+        Returns False if the store has to be loaded again to see them, which
+        is left to the caller as loading may belong on another thread.
+        """
+        changes = self.store.poll_changes()
+        if changes is None:
+            return False
+        for change in changes:
+            self.apply_elsewhere(change)
+        return True
+
+    def apply_elsewhere(self, change):
+        event, kind = change["op"].split("_", 1)
+        name = change["date"] if kind == 'specific' else kind
+        if event == 'add':
+            # Built first, so the group does not already hold the reminder
+            reminders = self.group(name)
+        else:
+            reminders = self.groups.get(name)
+        position = self.store.apply(change)
+        if position is None or reminders is None:
+            # Dropped, or in a group no records were handed out for
+            return
+        if event == 'add':
+            self.added(reminders, self.new_reminder(kind, change["text"], date=change.get("date"),
+                                                    rule=change.get("rule")))
+        elif event == 'update':
+            reminder = reminders[position]
+            reminder.text = change["text"]
+            if kind == 'recurring':
+                reminder.rule = change["rule"]
+            self.notify('updated', ReminderChange(kind, reminder))
+        else:
+            reminder = reminders.pop(position)
+            if not reminders and kind == 'specific':
+                del self.groups[name]
+            self.notify('removed', ReminderChange(kind, reminder))
+
+    def new_reminder(self, kind, text, date=None, rule=None):
+        reminder = Reminder(self.next_id, kind, text, date, rule)
+        self.next_id += 1
+        return reminder
+
+    def group(self, name, texts=None):
+        """Return the Reminder list of a group; texts saves reading a date the caller already has."""
+        reminders = self.groups.get(name)
+        if reminders is None:
+            if name == 'daily':
+                reminders = [self.new_reminder('daily', text) for text in self.store.daily_reminders]
+            elif name == 'recurring':
+                reminders = [self.new_reminder('recurring', item["text"], rule=item["rule"])
+                             for item in self.store.recurring_reminders]
+            else:
+                if texts is None:
+                    texts = self.store.reminders_on(name)
+                reminders = [self.new_reminder('specific', text, date=name) for text in texts]
+            self.groups[name] = reminders
+        return reminders
+
+    def position(self, reminder):
+        """Return the position of reminder in the store's list for its group."""
+        reminders = self.groups.get(reminder.group, ())
+        position = bisect.bisect_left(reminders, reminder.id, key=reminder_id)
+        if position == len(reminders) or reminders[position] is not reminder:
+            raise ValueError("The reminder was removed or the reminders were reloaded")
+        return position
+
+    @property
+    def daily_reminders(self):
+        return self.group('daily')
+
+    @property
+    def recurring_reminders(self):
+        return self.group('recurring')
+
+    def reminders_on(self, date):
+        """Return the specific reminders on a "%Y-%m-%d" date."""
+        return self.group(date)
+
+    @property
+    def loaded_from(self):
+        """First date from which the store holds every specific reminder in memory; None if it holds all."""
+        return self.store.loaded_from
+
+    def load_earlier(self):
+        return self.store.load_earlier()
+
+    def reminders_between(self, start=None, end=None):
+        """Yield (date, reminders) for the dates that have specific reminders, in date order."""
+        for date, texts in self.store.reminders_between(start, end):
+            yield date, self.group(date, texts)
+
+    @perf.timed("search")
+    def search(self, kind, query):
+        """Return the daily or specific reminders matching query, in list order."""
+        if not query_words(query):
+            # Nothing to search by, so leave the earlier months unread
+            return []
+        index = self.search_indexes.get(kind)
+        if index is None:
+            index = self.search_indexes[kind] = SearchIndex()
+            if kind == 'daily':
+                for reminder in self.daily_reminders:
+                    index.add(reminder)
+            else:
+                for date, reminders in self.reminders_between():
+                    for reminder in reminders:
+                        index.add(reminder)
+        return index.search(query)
+
+    def mutate(self, mutation, *args):
+        try:
+            mutation(*args)
+        except Exception:
+            # The in-memory reminders may or may not include the change
+            self.notify('reset')
+            raise
+
+    def added(self, reminders, reminder):
+        reminders.append(reminder)
+        self.notify('added', ReminderChange(reminder.kind, reminder))
+        return reminder
+
+    def add_daily(self, text):
+        reminders = self.daily_reminders
+        self.mutate(self.store.add_daily, text)
+        return self.added(reminders, self.new_reminder('daily', text))
+
+    def add_recurring(self, text, rule):
+        reminders = self.recurring_reminders
+        self.mutate(self.store.add_recurring, text, rule)
+        return self.added(reminders, self.new_reminder('recurring', text, rule=rule))
+
+    def add_specific(self, date, text):
+        reminders = self.reminders_on(date)
+        self.mutate(self.store.add_specific, date, text)
+        return self.added(reminders, self.new_reminder('specific', text, date=date))
+
+    @perf.timed("import.commit")
+    def add_many(self, items):
+        """Add (kind, text, date, rule) items in one batch, announced as a single 'reset'."""
+        changes = []
+        for kind, text, date, rule in items:
+            if kind == 'daily':
+                changes.append({"op": "add_daily", "text": text})
+            elif kind == 'recurring':
+                changes.append({"op": "add_recurring", "text": text, "rule": rule})
+            else:
+                changes.append({"op": "add_specific", "date": date, "text": text})
+        self.mutate(self.store.update_many, changes)
+        self.notify('reset')
+        return len(changes)
+
+    def update(self, reminder, text, rule=None):
+        """Change the text of a reminder, and the rule of a recurring one if rule is given."""
+        position = self.position(reminder)
+        if reminder.kind == 'daily':
+            self.mutate(self.store.update_daily, position, text)
+        elif reminder.kind == 'recurring':
+            rule = rule or reminder.rule
+            self.mutate(self.store.update_recurring, position, text, rule)
+            reminder.rule = rule
+        else:
+            self.mutate(self.store.update_specific, reminder.date, position, text)
+        reminder.text = text
+        self.notify('updated', ReminderChange(reminder.kind, reminder))
+
+    def delete(self, reminder):
+        position = self.position(reminder)
+        if reminder.kind == 'daily':
+            self.mutate(self.store.delete_daily, position)
+        elif reminder.kind == 'recurring':
+            self.mutate(self.store.delete_recurring, position)
+        else:
+            self.mutate(self.store.delete_specific, reminder.date, position)
+        reminders = self.groups[reminder.group]
+        del reminders[position]
+        if not reminders and reminder.kind == 'specific':
+            del self.groups[reminder.group]
+        self.notify('removed', ReminderChange(reminder.kind, reminder))
@@ -0,0 +1,116 @@
+"""Timing and counters for the hot paths, off unless enabled.
+
+Functions marked with @timed(name) and blocks in span(name) add to a count,
+total and worst time per name; count(name) bumps a plain counter. While
+disabled, a timed call costs one flag check and span() hands out a shared
+do-nothing context. Calls slower than SLOW seconds are also kept in a short
+log. Set REMINDER_PERF=1 to start with recording on.
+"""
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+SLOW = 1 / 60
+
+enabled = os.environ.get("REMINDER_PERF") == "1"
+timings = {}
+counters = {}
+slow_calls = deque(maxlen=200)
+# The background writer records from its own thread
+lock = threading.Lock()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    with lock:
+        timings.clear()
+        counters.clear()
+        slow_calls.clear()
+
+
+def record(name, seconds):
+    with lock:
+        stat = timings.get(name)
+        if stat is None:
+            timings[name] = [1, seconds, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+        if seconds >= SLOW:
+            slow_calls.append((time.time(), name, seconds))
+
+
+def count(name, amount=1):
+    if enabled:
+        with lock:
+            counters[name] = counters.get(name, 0) + amount
+
+
+def timed(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name):
+    return Span(name) if enabled else NULL_SPAN
+
+
+def snapshot():
+    """Return the numbers recorded so far, with times in milliseconds."""
+    with lock:
+        return {
+            "time": time.time(),
+            "timings": {
+                name: {"count": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls, "max_ms": worst * 1000}
+                for name, (calls, total, worst) in sorted(timings.items())
+            },
+            "counters": dict(sorted(counters.items())),
+            "slow_calls": [{"time": at, "name": name, "ms": seconds * 1000} for at, name, seconds in slow_calls]
+        }
+
+
+def export(path):
+    """Append the current snapshot to path as one JSON line."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(snapshot()) + "\n")
@@ -0,0 +1,190 @@
+import heapq
+import calendar
+import datetime
+
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+FREQUENCIES = ('once', 'daily', 'weekly', 'monthly')
+DEFAULT_TIME = datetime.time(9, 0)
+
+# How far ahead next_occurrence() looks; covers rules that only land on Feb 29
+SEARCH_HORIZON = datetime.timedelta(days=366 * 8)
+
+
+class Recurrence:
+    """A recurrence rule for a reminder.
+
+    freq is one of FREQUENCIES and repeats every interval days, weeks or
+    months counted from start. Weekly rules fire on weekdays (0 is Monday)
+    and monthly rules on monthdays; days a month does not have are skipped.
+    Every occurrence day fires at each of times. until, if set, is the last
+    day that may have an occurrence.
+
+    Occurrences are computed arithmetically from the window asked for, so the
+    cost of dates_between() grows with the number of occurrences returned and
+    not with the number of days in the window.
+    """
+    def __init__(self, freq, interval=1, weekdays=None, monthdays=None, times=None, start=None, until=None):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {freq}")
+        if interval < 1:
+            raise ValueError("Interval must be at least 1")
+        self.freq = freq
+        self.interval = interval
+        self.start = start or datetime.date.today()
+        self.until = until
+        self.weekdays = sorted(set(weekdays)) if weekdays else [self.start.weekday()]
+        self.monthdays = sorted(set(monthdays)) if monthdays else [self.start.day]
+        self.times = sorted(set(times)) if times else [DEFAULT_TIME]
+        if any(not 0 <= day <= 6 for day in self.weekdays):
+            raise ValueError("Weekdays must be between 0 (Monday) and 6 (Sunday)")
+        if any(not 1 <= day <= 31 for day in self.monthdays):
+            raise ValueError("Days of the month must be between 1 and 31")
+
+    def dates_between(self, start, end=None):
+        """Yield the occurrence dates with start <= date < end in order; end None is open."""
+        start = max(start, self.start)
+        if self.until is not None:
+            last = self.until + datetime.timedelta(days=1)
+            end = last if end is None else min(end, last)
+        if end is not None and start >= end:
+            return
+        if self.freq == 'once':
+            if start <= self.start:
+                yield self.start
+        elif self.freq == 'daily':
+            # Jump straight to the first day on the interval grid
+            day = start + datetime.timedelta(days=-(start - self.start).days % self.interval)
+            step = datetime.timedelta(days=self.interval)
+            while end is None or day < end:
+                yield day
+                day += step
+        elif self.freq == 'weekly':
+            first_monday = self.start - datetime.timedelta(days=self.start.weekday())
+            weeks = (start - first_monday).days // 7
+            weeks += -weeks % self.interval
+            monday = first_monday + datetime.timedelta(weeks=weeks)
+            step = datetime.timedelta(weeks=self.interval)
+            while end is None or monday < end:
+                for weekday in self.weekdays:
+                    day = monday + datetime.timedelta(days=weekday)
+                    if day >= start and (end is None or day < end):
+                        yield day
+                monday += step
+        else:
+            months = (start.year - self.start.year) * 12 + start.month - self.start.month
+            months += -months % self.interval
+            while True:
+                year, month = divmod(self.start.year * 12 + self.start.month - 1 + months, 12)
+                month += 1
+                if end is not None and datetime.date(year, month, 1) >= end:
+                    break
+                length = calendar.monthrange(year, month)[1]
+                for monthday in self.monthdays:
+                    if monthday > length:
+                        break
+                    day = datetime.date(year, month, monthday)
+                    if day >= start and (end is None or day < end):
+                        yield day
+                months += self.interval
+
+    def occurrences_between(self, start, end=None):
+        """Yield the occurrence datetimes with start <= occurrence < end in order."""
+        last_day = None if end is None else end.date() + datetime.timedelta(days=1)
+        for day in self.dates_between(start.date(), last_day):
+            for time in self.times:
+                occurrence = datetime.datetime.combine(day, time)
+                if end is not None and occurrence >= end:
+                    return
+                if occurrence >= start:
+                    yield occurrence
+
+    def next_occurrence(self, after):
+        """Return the first occurrence strictly after the given datetime, or None."""
+        for occurrence in self.occurrences_between(after, after + SEARCH_HORIZON):
+            if occurrence > after:
+                return occurrence
+        return None
+
+    def describe(self):
+        """Describe the rule in the syntax parse_rule() accepts."""
+        if self.freq == 'once':
+            parts = ["once", self.start.isoformat()]
+        else:
+            unit = {'daily': 'days', 'weekly': 'weeks', 'monthly': 'months'}[self.freq]
+            parts = [self.freq] if self.interval == 1 else ["every", str(self.interval), unit]
+            if self.freq == 'weekly':
+                parts.append(",".join(WEEKDAY_NAMES[day] for day in self.weekdays))
+            elif self.freq == 'monthly':
+                parts.append(",".join(str(day) for day in self.monthdays))
+        parts.extend(time.strftime("%H:%M") for time in self.times)
+        if self.freq != 'once':
+            parts.extend(["from", self.start.isoformat()])
+        if self.until is not None:
+            parts.extend(["until", self.until.isoformat()])
+        return " ".join(parts)
+
+
+def parse_rule(text, today=None):
+    """Parse rules such as "weekly mon,wed 09:00", "every 3 days 08:30",
+    "monthly 1,15 from 2025-01-01", "weekdays 07:00 18:00" or "once 2025-06-01 14:30".
+    """
+    tokens = text.lower().replace(", ", ",").split()
+    if not tokens:
+        raise ValueError("Empty recurrence rule")
+    freq, interval, weekdays, monthdays, times = None, 1, None, None, []
+    start, until = today, None
+    head = tokens.pop(0)
+    if head == 'every':
+        if len(tokens) < 2 or not tokens[0].isdigit():
+            raise ValueError("Use 'every N days', 'every N weeks' or 'every N months'")
+        interval = int(tokens.pop(0))
+        unit = tokens.pop(0).rstrip('s')
+        freq = {'day': 'daily', 'week': 'weekly', 'month': 'monthly'}.get(unit)
+        if freq is None:
+            raise ValueError(f"Unknown unit: {unit}")
+    elif head == 'weekdays':
+        freq, weekdays = 'weekly', [0, 1, 2, 3, 4]
+    elif head == 'once':
+        if not tokens:
+            raise ValueError("'once' needs a date")
+        freq, start = 'once', datetime.date.fromisoformat(tokens.pop(0))
+    elif head in FREQUENCIES:
+        freq = head
+    else:
+        raise ValueError(f"Unknown frequency: {head}")
+    while tokens:
+        token = tokens.pop(0)
+        if token in ('from', 'until'):
+            if not tokens:
+                raise ValueError(f"'{token}' needs a date")
+            day = datetime.date.fromisoformat(tokens.pop(0))
+            if token == 'from':
+                start = day
+            else:
+                until = day
+        elif ':' in token:
+            hour, minute = token.split(':')
+            times.append(datetime.time(int(hour), int(minute)))
+        elif token[:3] in WEEKDAY_NAMES:
+            weekdays = [WEEKDAY_NAMES.index(name[:3]) for name in token.split(',')]
+        elif token.replace(',', '').isdigit():
+            monthdays = [int(day) for day in token.split(',')]
+        else:
+            raise ValueError(f"Unexpected '{token}' in recurrence rule")
+    if weekdays and freq != 'weekly':
+        raise ValueError("Weekdays only apply to weekly rules")
+    if monthdays and freq != 'monthly':
+        raise ValueError("Days of the month only apply to monthly rules")
+    return Recurrence(freq, interval, weekdays, monthdays, times, start, until)
+
+
+def expand(items, start, end):
+    """Merge the occurrences of many (rule, payload) pairs into one ordered list.
+
+    Returns (occurrence, payload) pairs with start <= occurrence < end.
+    """
+    streams = [
+        ((occurrence, payload) for occurrence in rule.occurrences_between(start, end))
+        for rule, payload in items
+    ]
+    return list(heapq.merge(*streams, key=lambda pair: pair[0]))
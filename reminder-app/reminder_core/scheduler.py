@@ -0,0 +1,224 @@
+import heapq
+import random
+import datetime
+from . import perf
+from .clock import DayClock
+from .recurrence import parse_rule
+from .selection import ShuffleBag
+
+
+class NotificationScheduler:
+    """Min-heap of upcoming fire times with a single armed timer.
+
+    clock needs schedule_once(callback, delay) returning an event with
+    cancel(), which Kivy's Clock provides. Only the earliest entry has a timer
+    at any time; adding or removing entries re-arms it only when the earliest
+    entry changes. Removed entries are left in the heap and skipped when they
+    surface.
+    """
+    def __init__(self, clock, now=datetime.datetime.now):
+        self.clock = clock
+        self.now = now
+        self.heap = []
+        self.entries = {}
+        self.seq = 0
+        self.armed_entry = None
+        self.armed_event = None
+
+    def add(self, fire_at, key, callback, rearm=True):
+        """Call callback() at fire_at, replacing any entry already under key."""
+        self.remove(key, rearm=False)
+        self.seq += 1
+        entry = [fire_at, self.seq, key, callback]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        if rearm:
+            self.arm()
+
+    def remove(self, key, rearm=True):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[3] = None
+            if rearm:
+                self.arm()
+
+    def keys(self):
+        return list(self.entries)
+
+    def peek(self):
+        """Return the earliest live entry, dropping removed ones from the top."""
+        while self.heap and self.heap[0][3] is None:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def arm(self):
+        entry = self.peek()
+        if entry is self.armed_entry:
+            return
+        if self.armed_event is not None:
+            self.armed_event.cancel()
+            self.armed_event = None
+        self.armed_entry = entry
+        if entry is not None:
+            delay = max((entry[0] - self.now()).total_seconds(), 0)
+            self.armed_event = self.clock.schedule_once(self.fire_due, delay)
+
+    @perf.timed("scheduler.fire_due")
+    def fire_due(self, *args):
+        self.armed_entry = None
+        self.armed_event = None
+        now = self.now()
+        while True:
+            entry = self.peek()
+            if entry is None or entry[0] > now:
+                break
+            heapq.heappop(self.heap)
+            del self.entries[entry[2]]
+            entry[3]()
+        self.arm()
+
+    def catch_up(self):
+        """Fire what fell due while the clock was held up, e.g. while the app
+        was paused, and re-arm the timer from the current time."""
+        if self.armed_event is not None:
+            self.armed_event.cancel()
+        self.fire_due()
+
+    def stop(self):
+        for key in self.keys():
+            self.remove(key, rearm=False)
+        self.arm()
+
+
+class ReminderScheduler(NotificationScheduler):
+    """Schedules the notifications for reminders held in a store.
+
+    Each day gets daily_count daily reminders at random times between
+    start_hour and end_hour, with each text drawn from bag, a ShuffleBag,
+    when it fires, and today's specific
+    reminders at specific_time, or right away if that time has already passed.
+    The next day is planned on the rollover event of days, a DayClock that
+    may be shared with the rest of the app, so there is no polling.
+    Recurring reminders keep one entry each for their next occurrence, and the
+    one after is computed only when it fires.
+    """
+    def __init__(self, store, clock, notify, now=datetime.datetime.now,
+                 start_hour=6, end_hour=18, specific_time=datetime.time(9, 0), daily_count=1, bag=None, days=None):
+        super().__init__(clock, now)
+        self.days = days if days is not None else DayClock(clock, now)
+        self.store = store
+        self.notify = notify
+        self.daily_count = daily_count
+        self.bag = bag if bag is not None else ShuffleBag()
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.specific_time = specific_time
+        self.today = None
+        self.daily_planned = False
+        self.notified = set()
+
+    def start(self):
+        self.days.subscribe(self.plan_day)
+        self.plan_day(self.days.today)
+        self.plan_recurring()
+
+    def catch_up(self):
+        super().catch_up()
+        self.days.check()
+
+    def stop(self):
+        super().stop()
+        if self.plan_day in self.days.listeners:
+            self.days.unsubscribe(self.plan_day)
+
+    @perf.timed("scheduler.plan_day")
+    def plan_day(self, day):
+        self.today = day
+        self.daily_planned = False
+        self.notified = set()
+        self.plan_daily()
+        self.plan_specific()
+
+    def plan_daily(self):
+        if self.daily_planned or not self.store.daily_reminders:
+            return
+        self.daily_planned = True
+        now = self.now()
+        for number in range(self.daily_count):
+            fire_at = datetime.datetime.combine(self.today, self.get_random_time())
+            if fire_at > now:
+                self.add(fire_at, ('daily', self.today, number), self.send_daily, rearm=False)
+        self.arm()
+
+    def plan_specific(self):
+        """(Re)plan today's specific reminders; ones already sent today are skipped."""
+        date = self.days.key
+        for key in self.keys():
+            if key[0] == 'specific':
+                self.remove(key, rearm=False)
+        fire_at = max(datetime.datetime.combine(self.today, self.specific_time), self.now())
+        for position, text in enumerate(self.store.reminders_on(date)):
+            if text not in self.notified:
+                self.add(fire_at, ('specific', date, position), lambda text=text: self.send_specific(text), rearm=False)
+        self.arm()
+
+    @perf.timed("scheduler.plan_recurring")
+    def plan_recurring(self):
+        """(Re)plan the next occurrence of every recurring reminder."""
+        for key in self.keys():
+            if key[0] == 'recurring':
+                self.remove(key, rearm=False)
+        now = self.now()
+        for index, item in enumerate(self.store.recurring_reminders):
+            try:
+                rule = parse_rule(item["rule"])
+            except ValueError as e:
+                print(f"Skipping recurring reminder with a bad rule: {e}")
+                continue
+            self.plan_occurrence(index, rule, item["text"], now)
+        self.arm()
+
+    def plan_occurrence(self, index, rule, text, after):
+        occurrence = rule.next_occurrence(after)
+        if occurrence is not None:
+            self.add(occurrence, ('recurring', index),
+                     lambda: self.send_recurring(index, rule, text, occurrence), rearm=False)
+
+    def reminders_changed(self, change):
+        """Re-plan the entries a ReminderChange can affect."""
+        if self.today is None:
+            return
+        if change.kind == 'daily':
+            self.bag.changed()
+            self.plan_daily()
+        elif change.kind == 'recurring':
+            self.plan_recurring()
+        elif change.reminder.date == self.days.key:
+            self.plan_specific()
+
+    def reminders_reset(self):
+        """Re-plan everything after the reminders changed wholesale, e.g. after an import."""
+        if self.today is None:
+            return
+        self.bag.changed()
+        self.plan_daily()
+        self.plan_specific()
+        self.plan_recurring()
+
+    def get_random_time(self):
+        random_hour = random.randint(self.start_hour, self.end_hour)
+        random_minute = random.randint(0, 59)
+        return datetime.time(random_hour, random_minute)
+
+    def send_daily(self):
+        text = self.bag.draw(self.store.daily_reminders)
+        if text is not None:
+            self.notify("Daily Reminder", text)
+
+    def send_specific(self, text):
+        self.notified.add(text)
+        self.notify("Specific Reminder", text)
+
+    def send_recurring(self, index, rule, text, occurrence):
+        self.notify("Reminder", text)
+        self.plan_occurrence(index, rule, text, occurrence)
@@ -0,0 +1,84 @@
+import re
+import bisect
+from operator import attrgetter
+
+WORD = re.compile(r"\w+")
+ORDER = attrgetter('ordinal', 'id')
+# Shorter words start most words of a large list, so they are not searched by
+MIN_PREFIX = 2
+
+
+def tokenize(text):
+    return set(WORD.findall(text.lower()))
+
+
+def query_words(query):
+    """Return the words of query long enough to search by."""
+    return {word for word in tokenize(query) if len(word) >= MIN_PREFIX}
+
+
+class SearchIndex:
+    """Inverted index over reminder texts for prefix search as you type.
+
+    Reminders are indexed by their id, together with the text they had when
+    they were last indexed, because the model changes a Reminder before it
+    announces the change. terms holds every indexed word in sorted order,
+    which makes the words starting with a prefix one contiguous run of it.
+    """
+    def __init__(self):
+        self.docs = {}
+        self.postings = {}
+        self.terms = []
+
+    def add(self, reminder):
+        self.docs[reminder.id] = (reminder, reminder.text)
+        self.index_words(reminder.id, tokenize(reminder.text))
+
+    def update(self, reminder):
+        old_words, new_words = tokenize(self.docs[reminder.id][1]), tokenize(reminder.text)
+        self.unindex_words(reminder.id, old_words - new_words)
+        self.index_words(reminder.id, new_words - old_words)
+        self.docs[reminder.id] = (reminder, reminder.text)
+
+    def remove(self, reminder):
+        self.unindex_words(reminder.id, tokenize(self.docs.pop(reminder.id)[1]))
+
+    def index_words(self, doc, words):
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = set()
+                bisect.insort(self.terms, word)
+            posting.add(doc)
+
+    def unindex_words(self, doc, words):
+        for word in words:
+            posting = self.postings[word]
+            posting.discard(doc)
+            if not posting:
+                del self.postings[word]
+                del self.terms[bisect.bisect_left(self.terms, word)]
+
+    def matching(self, prefix):
+        """Return the ids of the reminders with a word starting with prefix."""
+        docs = set()
+        for index in range(bisect.bisect_left(self.terms, prefix), len(self.terms)):
+            term = self.terms[index]
+            if not term.startswith(prefix):
+                break
+            docs |= self.postings[term]
+        return docs
+
+    def search(self, query):
+        """Return the reminders, in list order, that have a word starting with
+        each word of query that has at least MIN_PREFIX letters."""
+        # Longer prefixes match fewer reminders, so start from those
+        words = sorted(query_words(query), key=len, reverse=True)
+        if not words:
+            return []
+        docs = self.matching(words[0])
+        for word in words[1:]:
+            if not docs:
+                break
+            docs &= self.matching(word)
+        return sorted((self.docs[doc][0] for doc in docs), key=ORDER)
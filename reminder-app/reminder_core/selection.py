@@ -0,0 +1,175 @@
+import os
+import json
+import random
+from collections import Counter
+from .storage import write_atomic
+
+
+def selection_path(path):
+    """Return where the selection state for the reminders file at path is kept."""
+    return os.path.splitext(path)[0] + ".selection.json"
+
+
+class ShuffleBag:
+    """Picks the daily reminder to send so none repeats before all have come up.
+
+    Each text puts as many tickets in the bag as its weight, 1 unless set
+    with set_weight(), so a text of weight 3 comes up three times a round.
+    A draw takes a random ticket out by swapping the last ticket into its
+    place, which keeps it O(1) however many reminders there are, and the bag
+    is refilled once it is empty. The bag only learns of edits through
+    changed(): texts added since get tickets in the current round, and
+    tickets of texts that are gone are dropped when they are drawn. A
+    draw skips the text sent last while the bag holds a ticket of another.
+
+    With a path, the weights, the tickets left in the round and the last
+    text sent are saved there and read back on the next start. The file is
+    rewritten only when a round starts or a weight changes; in between each
+    draw appends a line to a log next to it, so a draw stays O(1) on disk
+    too. Log lines carry the round they belong to, so a log left behind by
+    a crash before it was emptied is not replayed onto the new round.
+    """
+    def __init__(self, path=None, rng=random):
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".log" if path else None
+        self.log = None
+        self.rng = rng
+        self.weights = {}
+        self.tickets = []
+        self.last = None
+        # Counts the rewrites of the file, to tell its log lines from stale ones
+        self.round = 0
+        # Counter of the texts drawn from, taken on the first draw and again after changed()
+        self.pool = None
+        self.stale = False
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except (OSError, ValueError) as e:
+                print(f"Starting a new daily reminder round: {e}")
+
+    def load(self):
+        with open(self.path) as f:
+            state = json.load(f)
+        self.weights = dict(state.get("weights", {}))
+        self.tickets = list(state.get("tickets", []))
+        self.last = state.get("last")
+        self.round = state.get("round", 0)
+        if os.path.exists(self.log_path):
+            self.replay_log()
+
+    def replay_log(self):
+        tickets = Counter(self.tickets)
+        with open(self.log_path) as f:
+            for line in f:
+                try:
+                    round, change, text = json.loads(line)
+                except ValueError:
+                    # Torn by a crash mid-append; a draw or two comes up again
+                    break
+                if round != self.round:
+                    continue
+                if change > 0:
+                    tickets[text] += change
+                elif tickets[text] > 0:
+                    tickets[text] -= 1
+                    if change == 0:
+                        self.last = text
+        # The order of the tickets does not matter, as draws pick them at random
+        self.tickets = list(tickets.elements())
+
+    def save(self):
+        """Rewrite the file with the whole state and empty the log."""
+        if self.path is None:
+            return
+        self.round += 1
+        try:
+            write_atomic(self.path, {"weights": self.weights, "tickets": self.tickets, "last": self.last,
+                                     "round": self.round})
+            self.close()
+            open(self.log_path, 'w').close()
+        except OSError as e:
+            print(f"Error saving the daily reminder round: {e}")
+
+    def record(self, change, text):
+        """Append a change to the log: tickets added, -1 for a ticket dropped or 0 for one drawn."""
+        if self.path is None:
+            return
+        try:
+            if self.log is None:
+                self.log = open(self.log_path, 'a')
+            # Flushed but not synced; losing the last lines only lets a text come up again
+            self.log.write(json.dumps([self.round, change, text]) + "\n")
+            self.log.flush()
+        except OSError as e:
+            print(f"Error saving the daily reminder round: {e}")
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def weight(self, text):
+        return self.weights.get(text, 1)
+
+    def set_weight(self, text, weight):
+        """Give text weight tickets per round from the next round on."""
+        if not isinstance(weight, int) or weight < 1:
+            raise ValueError("A weight is a whole number of at least 1")
+        if weight == 1:
+            self.weights.pop(text, None)
+        else:
+            self.weights[text] = weight
+        self.save()
+
+    def changed(self):
+        """Note that the daily reminders changed; the next draw catches up with them."""
+        self.stale = True
+
+    def sync(self, texts):
+        pool = Counter(texts)
+        if self.pool is not None:
+            # Texts added since the last draw join the current round
+            for text, count in pool.items():
+                added = count - self.pool.get(text, 0)
+                if added > 0:
+                    self.tickets.extend([text] * (added * self.weight(text)))
+                    self.record(added * self.weight(text), text)
+        self.pool = pool
+        self.stale = False
+
+    def refill(self):
+        self.tickets = [text for text, count in self.pool.items() for _ in range(count * self.weight(text))]
+
+    def draw(self, texts):
+        """Return the next text to send out of texts, the current daily reminders, or None if there are none."""
+        if self.pool is None or self.stale:
+            self.sync(texts)
+        if not self.pool:
+            return None
+        # Tickets of the last text sent, parked at the end out of reach of the draws
+        held = 0
+        while True:
+            if not self.tickets:
+                self.refill()
+                self.save()
+            if held == len(self.tickets):
+                # Only the last text is left in the round, as a text of a higher weight can be
+                text = self.tickets.pop()
+                break
+            end = len(self.tickets) - held - 1
+            index = self.rng.randrange(end + 1)
+            self.tickets[index], self.tickets[end] = self.tickets[end], self.tickets[index]
+            text = self.tickets.pop(end)
+            if text not in self.pool:
+                self.record(-1, text)
+                continue
+            if text == self.last and len(self.pool) > 1:
+                # Avoid the same text twice in a row where a round ends and the next begins
+                self.tickets.append(text)
+                held += 1
+                continue
+            break
+        self.last = text
+        self.record(0, text)
+        return text
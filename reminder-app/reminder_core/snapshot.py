@@ -0,0 +1,176 @@
+"""Binary snapshot format for large reminder stores.
+
+Layout, all integers little-endian:
+
+    header   magic "RMDS", version u8, flags u8, 2 unused bytes, seq u64,
+             daily count u32, recurring count u32, date count u32
+    body     date table: for each date, its ISO text as u16 length + bytes,
+             then the number of reminders on it u32 and the offset u64 of its
+             first text within the texts below
+             texts: the daily texts, then a text and a rule for each recurring
+             reminder, then the specific texts grouped by date in table order
+
+Every text is a u32 byte length followed by UTF-8. With the COMPRESSED flag
+the body is one zlib stream. Each date is stored once, in the table, and the
+table is all that is needed to find a date's texts, so an uncompressed file
+is memory mapped and a date is only decoded when it is first read.
+"""
+import os
+import mmap
+import zlib
+import struct
+from collections.abc import MutableMapping
+from . import perf
+
+MAGIC = b"RMDS"
+VERSION = 1
+COMPRESSED = 0x01
+HEADER = struct.Struct("<4sBBxxQIII")
+DATE_ENTRY = struct.Struct("<IQ")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+
+
+def encode_text(out, text):
+    data = text.encode('utf-8')
+    out += U32.pack(len(data))
+    out += data
+
+
+def decode_texts(buffer, offset, count):
+    """Decode count texts starting at offset; return them and the offset after them."""
+    texts = []
+    for _ in range(count):
+        (length,) = U32.unpack_from(buffer, offset)
+        offset += U32.size
+        texts.append(str(buffer[offset:offset + length], 'utf-8'))
+        offset += length
+    return texts, offset
+
+
+class LazyDates(MutableMapping):
+    """Specific reminders by date, decoded from a snapshot when a date is first read.
+
+    encoded maps each date not read yet to (count, offset) within buffer. The
+    buffer, which may be a memory map, is closed once every date is decoded.
+    """
+    def __init__(self, buffer, encoded):
+        self.buffer = buffer
+        self.encoded = encoded
+        self.decoded = {}
+        if not encoded:
+            self.release()
+
+    def __getitem__(self, date):
+        texts = self.decoded.get(date)
+        if texts is None:
+            count, offset = self.encoded.pop(date)
+            texts = self.decoded[date] = decode_texts(self.buffer, offset, count)[0]
+            if not self.encoded:
+                self.release()
+        return texts
+
+    def __setitem__(self, date, texts):
+        self.encoded.pop(date, None)
+        self.decoded[date] = texts
+
+    def __delitem__(self, date):
+        if date in self.decoded:
+            del self.decoded[date]
+        else:
+            del self.encoded[date]
+            if not self.encoded:
+                self.release()
+
+    def __contains__(self, date):
+        return date in self.decoded or date in self.encoded
+
+    def __iter__(self):
+        # Reading a date moves it between the dicts, so iterate over a copy
+        return iter(list(self.decoded) + list(self.encoded))
+
+    def __len__(self):
+        return len(self.decoded) + len(self.encoded)
+
+    def release(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = None
+
+
+def read_binary(path):
+    """Read a binary snapshot into the dict shape of reminders.json.
+
+    Daily and recurring reminders are decoded right away; the specific ones
+    come as a LazyDates. "compressed" tells whether the file was compressed.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            raise ValueError(f"{path} is not a reminder snapshot")
+        magic, version, flags, seq, daily_count, recurring_count, date_count = HEADER.unpack(head)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a reminder snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} in {path}")
+        if flags & COMPRESSED:
+            buffer, offset = zlib.decompress(f.read()), 0
+        else:
+            # The map stays valid after the file is closed
+            buffer, offset = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), HEADER.size
+    table = []
+    for _ in range(date_count):
+        (length,) = U16.unpack_from(buffer, offset)
+        offset += U16.size
+        date = str(buffer[offset:offset + length], 'ascii')
+        offset += length
+        table.append((date, DATE_ENTRY.unpack_from(buffer, offset)))
+        offset += DATE_ENTRY.size
+    daily, offset = decode_texts(buffer, offset, daily_count)
+    pairs, offset = decode_texts(buffer, offset, 2 * recurring_count)
+    encoded = {date: (count, offset + text_offset) for date, (count, text_offset) in table}
+    return {
+        "specific_date_reminders": LazyDates(buffer, encoded),
+        "daily_reminders": daily,
+        "recurring_reminders": [{"text": text, "rule": rule} for text, rule in zip(pairs[::2], pairs[1::2])],
+        "seq": seq,
+        "compressed": bool(flags & COMPRESSED)
+    }
+
+
+@perf.timed("storage.write_snapshot")
+def write_binary(path, data, compress=False):
+    """Write data in the shape of reminders.json as a binary snapshot, through a temporary file."""
+    specific = data.get("specific_date_reminders", {})
+    daily = data.get("daily_reminders", [])
+    recurring = data.get("recurring_reminders", [])
+    texts = bytearray()
+    for text in daily:
+        encode_text(texts, text)
+    for item in recurring:
+        encode_text(texts, item["text"])
+        encode_text(texts, item["rule"])
+    table = bytearray()
+    dated = bytearray()
+    for date, date_texts in specific.items():
+        # Older JSON files hold a single string per date
+        date_texts = [date_texts] if isinstance(date_texts, str) else date_texts
+        date_bytes = date.encode('ascii')
+        table += U16.pack(len(date_bytes))
+        table += date_bytes
+        table += DATE_ENTRY.pack(len(date_texts), len(dated))
+        for text in date_texts:
+            encode_text(dated, text)
+    body = table + texts + dated
+    flags = 0
+    if compress:
+        body = zlib.compress(body)
+        flags |= COMPRESSED
+    header = HEADER.pack(MAGIC, VERSION, flags, data.get("seq", 0), len(daily), len(recurring), len(specific))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,1275 @@
+import os
+import re
+import json
+import time
+import datetime
+import sqlite3
+import threading
+from itertools import islice
+from collections import Counter
+from . import perf
+from .locking import FileLock, file_signature
+from .snapshot import LazyDates, read_binary, write_binary
+
+SHARD_NAME = re.compile(r"^\d{4}-\d{2}\.json$")
+
+
+def write_atomic(path, data):
+    """Write data to path through a temporary file so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def batched(records, size):
+    """Group an iterable into lists of at most size items."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def open_store(path):
+    """Pick a storage backend from the file extension of path."""
+    if os.path.splitext(path)[1] in (".db", ".sqlite"):
+        return SQLiteStore(path, legacy_path=os.path.splitext(path)[0] + ".json")
+    if os.path.splitext(path)[1] == ".snap":
+        return BinaryJournalStore(path)
+    if os.path.splitext(path)[1] == ".shards":
+        return ShardedStore(path, legacy_path=os.path.splitext(path)[0] + ".json")
+    return JournalStore(path)
+
+
+def journal_store_exists(path):
+    """Whether a JournalStore at path has anything on disk; a short-lived one may have only its journal."""
+    return os.path.exists(path) or os.path.exists(os.path.splitext(path)[0] + ".journal")
+
+
+def read_legacy(path):
+    """Load the reminders.json at path that another backend is created from.
+
+    It is read as a JournalStore, so changes not yet folded into the JSON
+    file come along.
+    """
+    legacy = JournalStore(path)
+    legacy.load()
+    legacy.close()
+    return legacy
+
+
+def move_aside(path):
+    """Rename a damaged file or directory out of the way; return its new name, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    target = f"{path}.damaged-{datetime.datetime.now():%Y%m%d-%H%M%S}"
+    os.replace(path, target)
+    return target
+
+
+class ReminderStore:
+    """Base class for reminder storage backends.
+
+    Daily and recurring reminders are always held in memory as lists; a
+    recurring reminder is a dict with its "text" and a "rule" string in the
+    syntax of recurrence.parse_rule(). Specific reminders are reached through
+    reminders_on() and reminders_between() so a backend is free to keep them
+    on disk. Every mutation is a change dict that is applied with
+    apply() and then persisted with record().
+
+    Loading is split so that parsing can happen off the UI thread:
+    begin_load() resets the in-memory state, read() parses the stored data
+    without touching that state and yields batches of records, add_loaded()
+    takes one batch into memory and finish_load() completes the load. Only
+    read() may run on another thread; load() runs all the steps in one go.
+
+    Persisting is split the same way: stage() captures what a change needs
+    written and write_pending() does the I/O for everything staged so far,
+    possibly on another thread. record() does both right away. With a
+    BackgroundWriter attached as writer, update() only stages and the writer
+    persists a burst of changes in one go.
+
+    A date may hold several specific reminders; they are addressed by the date
+    and their position within that date. A backend that reads older specific
+    reminders only on demand sets loaded_from to the first date it holds them
+    all from and reads further back with each load_earlier().
+    """
+    loaded_from = None
+    def __init__(self, path):
+        self.path = path
+        self.daily_reminders = []
+        self.recurring_reminders = []
+        self.writer = None
+        # Guards the hand-over from stage() to write_pending()
+        self.write_lock = threading.Lock()
+
+    def load(self):
+        self.begin_load()
+        for batch in self.read():
+            self.add_loaded(batch)
+        self.finish_load()
+
+    def begin_load(self):
+        self.daily_reminders = []
+        self.recurring_reminders = []
+
+    def read(self, batch_size=1000):
+        raise NotImplementedError
+
+    def add_loaded(self, records):
+        raise NotImplementedError
+
+    def finish_load(self):
+        pass
+
+    def save(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def source_files(self):
+        """Return the files and directories a load reads."""
+        return [self.path]
+
+    def set_aside(self):
+        """Move the files of a store that cannot be read out of the way, so saving starts new ones.
+
+        Returns where they went. Call it on a closed store and load a new one.
+        """
+        return [moved for moved in map(move_aside, self.source_files()) if moved]
+
+    def apply(self, change):
+        raise NotImplementedError
+
+    def stage(self, change):
+        """Capture what has to be written for a change that has already been applied."""
+        raise NotImplementedError
+
+    def write_pending(self):
+        """Write everything staged so far; may run on a worker thread."""
+        raise NotImplementedError
+
+    def record(self, change):
+        """Persist a single change that has already been applied."""
+        self.stage(change)
+        self.write_pending()
+
+    def stage_batch(self, changes):
+        """Capture what has to be written for a batch of applied changes."""
+        for change in changes:
+            self.stage(change)
+
+    def reminders_on(self, date):
+        """Return the texts of the specific reminders on a "%Y-%m-%d" date."""
+        raise NotImplementedError
+
+    def load_earlier(self):
+        """Bring the specific reminders before loaded_from a step closer; False if there are none."""
+        return False
+
+    def poll_changes(self):
+        """Return the changes other processes wrote to the store since it was read.
+
+        The caller apply()s them in order. None means the store has to be
+        loaded again to see them.
+        """
+        return []
+
+    def reminders_between(self, start=None, end=None):
+        """Yield (date, texts) in date order for start <= date < end; None leaves a bound open."""
+        raise NotImplementedError
+
+    def update(self, **change):
+        self.apply(change)
+        if self.writer is None:
+            self.record(change)
+        else:
+            self.stage(change)
+            self.writer.schedule()
+
+    def update_many(self, changes):
+        """Apply a batch of change dicts, e.g. from an import, and persist them in one write."""
+        for change in changes:
+            self.apply(change)
+        self.stage_batch(changes)
+        if self.writer is None:
+            self.write_pending()
+        else:
+            self.writer.schedule()
+
+    def add_daily(self, text):
+        self.update(op="add_daily", text=text)
+
+    def update_daily(self, index, text):
+        self.update(op="update_daily", index=index, text=text)
+
+    def delete_daily(self, index):
+        self.update(op="delete_daily", index=index)
+
+    def add_recurring(self, text, rule):
+        self.update(op="add_recurring", text=text, rule=rule)
+
+    def update_recurring(self, index, text, rule):
+        self.update(op="update_recurring", index=index, text=text, rule=rule)
+
+    def delete_recurring(self, index):
+        self.update(op="delete_recurring", index=index)
+
+    def add_specific(self, date, text):
+        self.update(op="add_specific", date=date, text=text)
+
+    def update_specific(self, date, position, text):
+        self.update(op="update_specific", date=date, position=position, text=text)
+
+    def delete_specific(self, date, position):
+        self.update(op="delete_specific", date=date, position=position)
+
+
+class JsonStore(ReminderStore):
+    """Keeps every reminder in one JSON file and rewrites it on each change."""
+    def __init__(self, path):
+        super().__init__(path)
+        self.specific_date_reminders = {}
+        self.staged_snapshot = None
+        # Only one write_pending() touches the files at a time
+        self.io_lock = threading.Lock()
+
+    def begin_load(self):
+        super().begin_load()
+        self.specific_date_reminders = {}
+
+    @perf.timed("storage.read_snapshot")
+    def read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def snapshot_records(self, data):
+        """Turn parsed snapshot data into (kind, value) records for add_loaded()."""
+        for text in data.get("daily_reminders", []):
+            yield 'daily', text
+        for item in data.get("recurring_reminders", []):
+            yield 'recurring', item
+        specific = data.get("specific_date_reminders", {})
+        if isinstance(specific, LazyDates):
+            # Taken over whole so that its dates stay undecoded until they are read
+            yield 'dates', specific
+            return
+        for date, texts in specific.items():
+            # Older files hold a single string per date
+            for text in [texts] if isinstance(texts, str) else texts:
+                yield 'specific', (date, text)
+
+    def read(self, batch_size=1000):
+        yield from batched(self.snapshot_records(self.read_snapshot()), batch_size)
+
+    def add_loaded(self, records):
+        for kind, value in records:
+            if kind == 'daily':
+                self.daily_reminders.append(value)
+            elif kind == 'recurring':
+                self.recurring_reminders.append(value)
+            elif kind == 'specific':
+                self.specific_date_reminders.setdefault(value[0], []).append(value[1])
+            elif kind == 'dates':
+                self.specific_date_reminders = value
+            else:
+                self.apply(value)
+
+    def save(self):
+        self.stage_snapshot()
+        self.write_pending()
+
+    def close(self):
+        self.write_pending()
+
+    def stage(self, change):
+        self.stage_snapshot()
+
+    def stage_batch(self, changes):
+        # One snapshot covers the whole batch, where stage() per change would copy it each time
+        self.stage_snapshot()
+
+    def stage_snapshot(self):
+        snapshot = self.snapshot()
+        with self.write_lock:
+            self.staged_snapshot = snapshot
+
+    def write_pending(self):
+        with self.io_lock:
+            with self.write_lock:
+                snapshot, self.staged_snapshot = self.staged_snapshot, None
+            if snapshot is None:
+                return
+            try:
+                self.write_snapshot(snapshot)
+            except Exception:
+                with self.write_lock:
+                    if self.staged_snapshot is None:
+                        self.staged_snapshot = snapshot
+                raise
+
+    def write_snapshot(self, snapshot):
+        # Timed here, as write_atomic() also writes shards, the manifest and selection state
+        with perf.span("storage.write_snapshot"):
+            write_atomic(self.path, snapshot)
+
+    def snapshot(self):
+        """Copy the reminders into a dict for json.dump() that later changes do not touch."""
+        return {
+            "specific_date_reminders": {date: list(texts) for date, texts in self.specific_date_reminders.items()},
+            "daily_reminders": list(self.daily_reminders),
+            "recurring_reminders": list(self.recurring_reminders)
+        }
+
+    def apply(self, change):
+        """Apply a change dict to the in-memory reminders.
+
+        Returns the position of the reminder added, updated or deleted, or
+        None if the change was dropped; see locate().
+        """
+        op = change["op"]
+        if op == "add_daily":
+            self.daily_reminders.append(change["text"])
+            return len(self.daily_reminders) - 1
+        elif op == "update_daily":
+            index = self.locate(self.daily_reminders, change["index"], change)
+            if index is not None:
+                self.daily_reminders[index] = change["text"]
+            return index
+        elif op == "delete_daily":
+            index = self.locate(self.daily_reminders, change["index"], change)
+            if index is not None:
+                del self.daily_reminders[index]
+            return index
+        elif op == "add_recurring":
+            self.recurring_reminders.append({"text": change["text"], "rule": change["rule"]})
+            return len(self.recurring_reminders) - 1
+        elif op == "update_recurring":
+            index = self.locate(self.recurring_reminders, change["index"], change)
+            if index is not None:
+                self.recurring_reminders[index] = {"text": change["text"], "rule": change["rule"]}
+            return index
+        elif op == "delete_recurring":
+            index = self.locate(self.recurring_reminders, change["index"], change)
+            if index is not None:
+                del self.recurring_reminders[index]
+            return index
+        elif op == "add_specific":
+            texts = self.specific_date_reminders.setdefault(change["date"], [])
+            texts.append(change["text"])
+            return len(texts) - 1
+        elif op == "update_specific":
+            texts = self.specific_date_reminders.get(change["date"], [])
+            position = self.locate(texts, change["position"], change)
+            if position is not None:
+                texts[position] = change["text"]
+            return position
+        elif op == "delete_specific":
+            texts = self.specific_date_reminders.get(change["date"], [])
+            position = self.locate(texts, change["position"], change)
+            if position is not None:
+                del texts[position]
+                if not texts:
+                    del self.specific_date_reminders[change["date"]]
+            return position
+        else:
+            raise ValueError(f"Unknown reminder operation: {op}")
+
+    def locate(self, items, position, change):
+        """Return where the reminder an update or delete is for is now, or None if it is gone.
+
+        The first time a change is applied it records the text at its
+        position as "old". A change read back from a journal that another
+        process wrote to as well may have been made before changes that
+        shifted the list, so it goes to the reminder with that text instead,
+        and is dropped if there is none.
+        """
+        def text(item):
+            return item["text"] if isinstance(item, dict) else item
+
+        if "old" not in change:
+            change["old"] = text(items[position])
+            return position
+        if position < len(items) and text(items[position]) == change["old"]:
+            return position
+        for index, item in enumerate(items):
+            if text(item) == change["old"]:
+                return index
+        perf.count("storage.conflicts")
+        return None
+
+    def reminders_on(self, date):
+        return list(self.specific_date_reminders.get(date, []))
+
+    def reminders_between(self, start=None, end=None):
+        for date in sorted(self.specific_date_reminders):
+            if (start is None or date >= start) and (end is None or date < end):
+                yield date, list(self.specific_date_reminders[date])
+
+
+class JournalStore(JsonStore):
+    """Appends each change to a journal next to the JSON snapshot.
+
+    Mutations cost one appended line regardless of how many reminders exist.
+    Once compact_every changes have piled up the journal is folded into a new
+    snapshot, by read() on the loading thread for one found on disk. Every journal entry carries a sequence number and the snapshot
+    stores the last one it contains, so a crash between writing the snapshot
+    and truncating the journal never replays a change twice. A torn last line
+    left by a crash mid-append is dropped on load.
+
+    Staged changes are written together with a single fsync, or folded into
+    a staged snapshot.
+
+    Several processes, e.g. the app and the command line, may share the
+    files. Each write holds the FileLock next to them and numbers its lines
+    on from the last sequence number on disk, whichever process wrote it.
+    The size and mtime of the files tell a store that someone else wrote;
+    poll_changes() then reads just the lines it has not seen, which are
+    matched to reminders by text as JsonStore.locate() describes. A snapshot
+    is only written by a store that has seen every line on disk, as it would
+    drop the ones it has not.
+    """
+    def __init__(self, path, compact_every=500):
+        super().__init__(path)
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.lock = FileLock(os.path.splitext(path)[0] + ".lock")
+        self.compact_every = compact_every
+        # Last sequence number whose change is in memory
+        self.seq = 0
+        self.pending = 0
+        self.journal = None
+        self.staged_changes = []
+        # How many of the staged changes the staged snapshot already holds
+        self.staged_covered = 0
+        # The files as this store last read or wrote them; see signature()
+        self.known_signature = (None, None)
+        self.journal_offset = 0
+        # Lines this store wrote while lines by others were still unread
+        self.own_seqs = set()
+
+    def signature(self):
+        return file_signature(self.path), file_signature(self.journal_path)
+
+    def begin_load(self):
+        self.close_journal()
+        super().begin_load()
+        # As if nothing was read, so a store whose read failed journals rather than replaces the files
+        self.read_state = (0, 0, 0, (None, None))
+
+    def source_files(self):
+        return [self.path, self.journal_path]
+
+    def read(self, batch_size=1000):
+        with self.lock:
+            data = self.read_snapshot()
+            lines, good_offset = self.read_journal()
+            seq = data.get("seq", 0)
+            changes = []
+            for change in lines:
+                if change["seq"] > seq:
+                    changes.append(change)
+                    seq = change["seq"]
+            if len(changes) >= self.compact_every:
+                # Folded here rather than in finish_load(), which runs on the UI thread
+                self.fold(data, changes, seq)
+                data, changes = self.read_snapshot(), []
+                good_offset = 0
+            signature = self.signature()
+        yield from batched(self.snapshot_records(data), batch_size)
+        # Picked up by finish_load(), which runs once every batch has been added
+        self.read_state = (seq, len(changes), good_offset, signature)
+        yield from batched((('change', change) for change in changes), batch_size)
+
+    @perf.timed("storage.compact")
+    def fold(self, data, changes, seq):
+        """Write the snapshot data with changes applied and start an empty journal. Holds the lock."""
+        scratch = JsonStore(self.path)
+        scratch.add_loaded(self.snapshot_records(data))
+        for change in changes:
+            scratch.apply(change)
+        snapshot = scratch.snapshot()
+        snapshot["seq"] = seq
+        self.write_snapshot(snapshot)
+        open(self.journal_path, 'w').close()
+
+    def read_journal(self, offset=0):
+        """Return the whole journal lines from byte offset on as change dicts, and the offset after them."""
+        changes = []
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                        if not line.endswith(b"\n") or "seq" not in change:
+                            raise ValueError("incomplete line")
+                    except ValueError:
+                        print(f"Dropping damaged journal tail at byte {offset}")
+                        break
+                    changes.append(change)
+                    offset += len(line)
+        return changes, offset
+
+    def finish_load(self):
+        self.seq, self.pending, good_offset, signature = self.read_state
+        self.known_signature = signature
+        self.journal_offset = good_offset
+        self.own_seqs = set()
+        if signature[1] is not None and good_offset != signature[1][1]:
+            with self.lock:
+                # Unless someone appended since, in which case the next read stops at the tail again
+                if self.signature() == signature:
+                    with open(self.journal_path, 'r+b') as f:
+                        f.truncate(good_offset)
+                    self.known_signature = self.signature()
+
+    def poll_changes(self):
+        if self.signature() == self.known_signature or not self.lock.acquire(blocking=False):
+            return []
+        try:
+            signature = self.signature()
+            if signature[0] != self.known_signature[0]:
+                # Someone folded the journal into a new snapshot
+                return None
+            lines, offset = self.read_journal(self.journal_offset)
+            changes = []
+            for change in lines:
+                if change["seq"] in self.own_seqs:
+                    self.own_seqs.discard(change["seq"])
+                elif change["seq"] > self.seq:
+                    changes.append(change)
+                self.seq = max(self.seq, change["seq"])
+            perf.count("storage.changes_polled", len(changes))
+            self.pending += len(changes)
+            self.journal_offset = offset
+            self.known_signature = signature
+            return changes
+        finally:
+            self.lock.release()
+
+    def stage(self, change):
+        self.pending += 1
+        perf.count("storage.changes_staged")
+        with self.write_lock:
+            self.staged_changes.append(change)
+        if self.pending >= self.compact_every:
+            self.stage_snapshot()
+
+    def stage_batch(self, changes):
+        self.pending += len(changes)
+        with self.write_lock:
+            self.staged_changes.extend(changes)
+        # A single snapshot is cheaper than journaling a large batch line by line
+        self.stage_snapshot()
+
+    def stage_snapshot(self):
+        # The staged changes are kept in case the snapshot cannot be written
+        snapshot = self.snapshot()
+        with self.write_lock:
+            self.staged_snapshot = snapshot
+            self.staged_covered = len(self.staged_changes)
+        self.pending = 0
+
+    @perf.timed("storage.write_journal")
+    def write_pending(self):
+        with self.io_lock:
+            with self.write_lock:
+                snapshot, covered, changes = self.staged_snapshot, self.staged_covered, self.staged_changes
+                self.staged_snapshot, self.staged_covered, self.staged_changes = None, 0, []
+            if snapshot is None and not changes:
+                return
+            try:
+                with self.lock:
+                    self.write_versioned(snapshot, covered, changes)
+            except Exception:
+                with self.write_lock:
+                    if self.staged_snapshot is None:
+                        self.staged_snapshot, self.staged_covered = snapshot, covered
+                    else:
+                        # The newer snapshot holds these changes too
+                        self.staged_covered += len(changes)
+                    self.staged_changes = changes + self.staged_changes
+                raise
+
+    def write_versioned(self, snapshot, covered, changes):
+        """Write a snapshot and the changes staged after it, or else every change, as journal lines
+        numbered on from the files. covered is how many of the changes the snapshot holds. Holds the lock."""
+        signature = self.signature()
+        seen_all = signature == self.known_signature
+        seq = self.seq if seen_all else self.disk_seq(signature)
+        if snapshot is not None and seen_all:
+            seq += covered
+            snapshot["seq"] = seq
+            self.write_snapshot(snapshot)
+            self.close_journal()
+            open(self.journal_path, 'w').close()
+            changes = changes[covered:]
+        if changes:
+            lines = []
+            for change in changes:
+                seq += 1
+                lines.append(json.dumps(dict(change, seq=seq)) + "\n")
+                if not seen_all:
+                    self.own_seqs.add(seq)
+            if self.journal is None:
+                self.journal = open(self.journal_path, 'a')
+            self.journal.write("".join(lines))
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+        if seen_all:
+            self.seq = seq
+            self.known_signature = self.signature()
+            self.journal_offset = self.known_signature[1][1] if self.known_signature[1] else 0
+
+    def disk_seq(self, signature):
+        """Return the last sequence number in the files, written by any process. Holds the lock."""
+        if signature[0] != self.known_signature[0]:
+            seq, offset = self.read_snapshot().get("seq", 0), 0
+        else:
+            seq, offset = self.seq, self.journal_offset
+        for change in self.read_journal(offset)[0]:
+            seq = max(seq, change["seq"])
+        return seq
+
+    def close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def close(self):
+        # A short journal is left in place; folding it would make other processes reload everything
+        self.write_pending()
+        self.close_journal()
+        self.lock.close()
+
+
+class BinaryJournalStore(JournalStore):
+    """JournalStore with its snapshot in the binary format of reminder_core.snapshot.
+
+    Specific reminders are decoded a date at a time as they are read, so
+    opening a large store only costs reading the daily and recurring ones.
+    A snapshot is written compressed if the one it was loaded from was.
+    """
+    def __init__(self, path, compact_every=500, compress=False):
+        super().__init__(path, compact_every)
+        # Not shared with a JSON snapshot of the same name
+        self.journal_path = path + ".journal"
+        self.lock = FileLock(path + ".lock")
+        self.compress = compress
+
+    @perf.timed("storage.read_snapshot")
+    def read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        data = read_binary(self.path)
+        self.compress = data["compressed"]
+        return data
+
+    def write_snapshot(self, snapshot):
+        write_binary(self.path, snapshot, self.compress)
+
+
+class ShardedStore(JsonStore):
+    """Keeps reminders in a directory of small JSON files, one per month.
+
+    daily.json holds the daily and recurring reminders, YYYY-MM.json the
+    specific reminders of one month and manifest.json how many reminders each
+    shard has. Loading reads the daily shard and the shards from the current
+    month on; an earlier month is read the first time one of its dates is
+    asked for, so the screens and the scheduler start without the history.
+    loaded_from is the date from which every specific reminder is in memory.
+
+    A change rewrites only the shard it touches and then the manifest. The
+    shard files on disk are what a load goes by, so a crash between the two
+    leaves at most a stale count in the manifest. When the directory does
+    not exist yet, the JSON file at legacy_path is imported on the first load.
+
+    Writes hold the FileLock next to the directory. Each write counts up the
+    generation in the manifest and records it for the shards it wrote. A
+    shard that another process wrote since it was read is merged with
+    merge_shard() rather than overwritten, and a manifest changed by someone
+    else tells poll_changes() to have the store loaded again.
+    """
+    def __init__(self, path, legacy_path=None, today=datetime.date.today):
+        super().__init__(path)
+        self.legacy_path = legacy_path
+        self.today = today
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.lock = FileLock(path + ".lock")
+        # Reminder count of each shard, by "daily" or "YYYY-MM"
+        self.manifest = {}
+        self.manifest_signature = None
+        self.generation = 0
+        # Generation each shard was last written in, as of the last load
+        self.written = {}
+        self.loaded_months = set()
+        # Dates with specific reminders in memory, by "YYYY-MM"
+        self.month_dates = {}
+        self.imported = False
+        self.staged_shards = {}
+        # (generation, data) of each shard as last read or written, the base for merges
+        self.synced = {}
+
+    def shard_path(self, name):
+        return os.path.join(self.path, name + ".json")
+
+    def read_shard(self, name):
+        path = self.shard_path(name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def source_files(self):
+        if os.path.isdir(self.path) or not self.legacy_path:
+            return [self.path]
+        # The load was importing the legacy file
+        return JournalStore(self.legacy_path).source_files()
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def begin_load(self):
+        super().begin_load()
+        self.manifest = {}
+        self.manifest_signature = None
+        self.generation = 0
+        self.written = {}
+        self.loaded_months = set()
+        self.month_dates = {}
+        self.imported = False
+        self.synced = {}
+
+    def read(self, batch_size=1000):
+        if not os.path.isdir(self.path):
+            if self.legacy_path and journal_store_exists(self.legacy_path):
+                data = read_legacy(self.legacy_path).snapshot()
+                yield from batched(self.snapshot_records(data), batch_size)
+                yield [('imported', {date[:7] for date in data.get("specific_date_reminders", {})})]
+            return
+        with self.lock:
+            signature = file_signature(self.manifest_path)
+            data = self.read_manifest()
+            manifest = data.get("shards", {})
+            for name in os.listdir(self.path):
+                if SHARD_NAME.match(name):
+                    # Count not known until the shard is read
+                    manifest.setdefault(name[:-len(".json")], None)
+            current = self.today().strftime("%Y-%m")
+            upcoming = sorted(month for month in manifest if month != "daily" and month >= current)
+            shards = [(name, self.read_shard(name)) for name in ["daily"] + upcoming]
+        yield [('manifest', (manifest, signature, data.get("generation", 0), data.get("written", {})))]
+        for name, shard in shards:
+            records = self.snapshot_records(shard) if name == "daily" else self.month_records(shard)
+            yield from batched(records, batch_size)
+            yield [('synced', (name, shard))]
+        yield [('months', upcoming)]
+
+    def month_records(self, shard):
+        for date, texts in shard.items():
+            for text in texts:
+                yield 'specific', (date, text)
+
+    def add_loaded(self, records):
+        for kind, value in records:
+            if kind == 'manifest':
+                self.manifest, self.manifest_signature, self.generation, self.written = value
+            elif kind == 'synced':
+                name, data = value
+                self.synced[name] = (self.written.get(name, 0), data)
+            elif kind == 'months':
+                self.loaded_months.update(value)
+            elif kind == 'imported':
+                self.loaded_months.update(value)
+                self.imported = True
+            else:
+                super().add_loaded([(kind, value)])
+                if kind == 'specific':
+                    self.month_dates.setdefault(value[0][:7], set()).add(value[0])
+
+    def finish_load(self):
+        if self.imported:
+            # Left to the writer if there is one, so writing every shard does not hold up the first frame
+            self.stage_all()
+            if self.writer is None:
+                self.write_pending()
+            else:
+                self.writer.schedule()
+
+    def close(self):
+        super().close()
+        self.lock.close()
+
+    def poll_changes(self):
+        signature = file_signature(self.manifest_path)
+        if signature == self.manifest_signature or not self.lock.acquire(blocking=False):
+            return []
+        try:
+            if self.read_manifest().get("generation", 0) != self.generation:
+                return None
+            self.manifest_signature = signature
+            return []
+        finally:
+            self.lock.release()
+
+    @perf.timed("storage.load_shard")
+    def load_month(self, month):
+        """Read a month's shard into memory unless it is there already."""
+        if month in self.loaded_months:
+            return
+        if month in self.manifest:
+            data = self.read_shard(month)
+            self.add_loaded(self.month_records(data))
+            # The shard may be newer than its generation as of the load, which only costs a needless merge
+            self.synced[month] = (self.written.get(month, 0), data)
+        self.loaded_months.add(month)
+
+    @property
+    def loaded_from(self):
+        unloaded = [month for month in self.manifest if month != "daily" and month not in self.loaded_months]
+        if not unloaded:
+            return None
+        year, month = map(int, max(unloaded).split("-"))
+        return datetime.date(year + month // 12, month % 12 + 1, 1).isoformat()
+
+    def load_earlier(self):
+        unloaded = [month for month in self.manifest if month != "daily" and month not in self.loaded_months]
+        if not unloaded:
+            return False
+        self.load_month(max(unloaded))
+        return True
+
+    def apply(self, change):
+        if "date" in change:
+            # Rewriting the shard must not drop the reminders not read yet
+            self.load_month(change["date"][:7])
+        position = super().apply(change)
+        if "date" in change:
+            dates = self.month_dates.setdefault(change["date"][:7], set())
+            if change["date"] in self.specific_date_reminders:
+                dates.add(change["date"])
+            else:
+                dates.discard(change["date"])
+        return position
+
+    def save(self):
+        self.stage_all()
+        self.write_pending()
+
+    def stage_all(self):
+        self.stage_shard("daily")
+        for month in sorted(self.loaded_months):
+            self.stage_shard(month)
+
+    def stage(self, change):
+        self.stage_shard(change["date"][:7] if "date" in change else "daily")
+
+    def stage_batch(self, changes):
+        for name in sorted({change["date"][:7] if "date" in change else "daily" for change in changes}):
+            self.stage_shard(name)
+
+    def stage_shard(self, name):
+        if name == "daily":
+            data = {"daily_reminders": list(self.daily_reminders),
+                    "recurring_reminders": list(self.recurring_reminders)}
+        else:
+            data = {date: list(self.specific_date_reminders[date]) for date in sorted(self.month_dates.get(name, ()))}
+        count = shard_count(name, data)
+        if count:
+            self.manifest[name] = count
+        else:
+            self.manifest.pop(name, None)
+        with self.write_lock:
+            self.staged_shards[name] = data
+
+    @perf.timed("storage.write_shards")
+    def write_pending(self):
+        with self.io_lock:
+            with self.write_lock:
+                shards, self.staged_shards = self.staged_shards, {}
+            if not shards:
+                return
+            try:
+                os.makedirs(self.path, exist_ok=True)
+                with self.lock:
+                    self.write_merged(shards)
+            except Exception:
+                with self.write_lock:
+                    for name, data in shards.items():
+                        self.staged_shards.setdefault(name, data)
+                raise
+
+    def write_merged(self, shards):
+        """Write staged shards and the manifest, merging in what others wrote since. Holds the lock."""
+        manifest = self.read_manifest()
+        seen_all = manifest.get("generation", 0) == self.generation
+        generation = manifest.get("generation", 0) + 1
+        counts, written = manifest.get("shards", {}), manifest.get("written", {})
+        for name, ours in shards.items():
+            base_generation, base = self.synced.get(name, (0, {}))
+            if written.get(name, 0) == base_generation:
+                data = ours
+                self.synced[name] = (generation, ours)
+            else:
+                data = merge_shard(name, base, ours, self.read_shard(name))
+                perf.count("storage.merges")
+                seen_all = False
+                # Memory still lacks what was merged in, so the next write of the shard merges again
+                self.synced[name] = (-1, ours)
+            counts[name] = shard_count(name, data)
+            if counts[name]:
+                write_atomic(self.shard_path(name), data)
+            elif os.path.exists(self.shard_path(name)):
+                # An empty shard is removed rather than written
+                os.remove(self.shard_path(name))
+            written[name] = generation
+        write_atomic(self.manifest_path, {"version": 1, "generation": generation, "written": written,
+                                          "shards": {name: count for name, count in counts.items() if count}})
+        if seen_all:
+            self.generation = generation
+            self.manifest_signature = file_signature(self.manifest_path)
+
+    def reminders_on(self, date):
+        self.load_month(date[:7])
+        return super().reminders_on(date)
+
+    def reminders_between(self, start=None, end=None):
+        for month in sorted(self.manifest):
+            if (month != "daily" and month not in self.loaded_months
+                    and (start is None or month >= start[:7]) and (end is None or month <= end[:7])):
+                self.load_month(month)
+        return super().reminders_between(start, end)
+
+
+def shard_count(name, data):
+    if name == "daily":
+        return len(data.get("daily_reminders", [])) + len(data.get("recurring_reminders", []))
+    return sum(map(len, data.values()))
+
+
+def merge_lists(base, ours, theirs):
+    """Three-way merge of lists of hashable items as multisets.
+
+    Keeps theirs, less what ours removed from base, and appends what ours
+    added. A text both sides changed ends up in both versions.
+    """
+    removed = Counter(base) - Counter(ours)
+    added = Counter(ours) - Counter(base)
+    merged = []
+    for item in theirs:
+        if removed[item]:
+            removed[item] -= 1
+        else:
+            merged.append(item)
+    for item in ours:
+        if added[item]:
+            added[item] -= 1
+            merged.append(item)
+    return merged
+
+
+def merge_shard(name, base, ours, theirs):
+    """Merge the changes from base to ours into theirs, the shard as another process wrote it."""
+    if name == "daily":
+        def rules(data):
+            return [(item["text"], item["rule"]) for item in data.get("recurring_reminders", [])]
+
+        return {
+            "daily_reminders": merge_lists(base.get("daily_reminders", []), ours.get("daily_reminders", []),
+                                           theirs.get("daily_reminders", [])),
+            "recurring_reminders": [{"text": text, "rule": rule}
+                                    for text, rule in merge_lists(rules(base), rules(ours), rules(theirs))]
+        }
+    merged = {}
+    for date in sorted(set(base) | set(ours) | set(theirs)):
+        texts = merge_lists(base.get(date, []), ours.get(date, []), theirs.get(date, []))
+        if texts:
+            merged[date] = texts
+    return merged
+
+
+def write_shards(path, data):
+    """Write data in the shape of reminders.json as a new sharded store at path."""
+    store = ShardedStore(path)
+    store.add_loaded(store.snapshot_records(data))
+    store.loaded_months.update(date[:7] for date in data.get("specific_date_reminders", {}))
+    store.save()
+
+
+class SQLiteStore(ReminderStore):
+    """Keeps reminders in an SQLite database with specific reminders indexed by date.
+
+    Only the daily and recurring reminders are read into memory on load;
+    specific reminders stay on disk and each query reads just the rows for the
+    dates it asks for. The row ids of the dates read so far are kept, so a
+    position keeps meaning the row it meant when the date was read.
+    When the database is created next to an existing JSON file, that file is
+    imported once. Changes run in an open transaction and write_pending()
+    commits them, so the connection is shared with the writer thread and
+    every use of it holds write_lock.
+
+    Another process may change the database at any time; its data_version
+    tells poll_changes() when one has committed. Until then an update or
+    delete names both the row id and the text this store read, so a change to
+    a row someone else changed or removed is refused with ValueError rather
+    than landing on another row.
+    """
+    def __init__(self, path, legacy_path=None):
+        super().__init__(path)
+        self.legacy_path = legacy_path
+        self.db = None
+        self.daily_ids = []
+        self.recurring_ids = []
+        # [(id, text)] of the specific reminders on each date read so far
+        self.specific_rows = {}
+        self.data_version = None
+        self.import_pending = False
+
+    def begin_load(self):
+        self.close()
+        super().begin_load()
+        self.daily_ids = []
+        self.recurring_ids = []
+        self.specific_rows = {}
+        created = not os.path.exists(self.path)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS daily (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS recurring (id INTEGER PRIMARY KEY, text TEXT NOT NULL, rule TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS specific (id INTEGER PRIMARY KEY, date TEXT NOT NULL, text TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS specific_date ON specific (date, id);
+            """)
+        except sqlite3.DatabaseError:
+            # Not kept half-open, so nothing queries a file that is not a database
+            db.close()
+            raise
+        self.db = db
+        # Done by read(), as a large file would hold up the UI thread
+        self.import_pending = bool(created and self.legacy_path and journal_store_exists(self.legacy_path))
+
+    def read(self, batch_size=1000):
+        # SQLite connections belong to the thread that opened them
+        db = sqlite3.connect(self.path)
+        try:
+            if self.import_pending:
+                self.import_json(db, self.legacy_path)
+                self.import_pending = False
+            rows = db.execute("SELECT id, text FROM daily ORDER BY id")
+            yield from batched((('daily', row) for row in rows), batch_size)
+            rows = db.execute("SELECT id, text, rule FROM recurring ORDER BY id")
+            yield from batched((('recurring', row) for row in rows), batch_size)
+        finally:
+            db.close()
+
+    def add_loaded(self, records):
+        for kind, row in records:
+            if kind == 'daily':
+                self.daily_ids.append(row[0])
+                self.daily_reminders.append(row[1])
+            else:
+                self.recurring_ids.append(row[0])
+                self.recurring_reminders.append({"text": row[1], "rule": row[2]})
+
+    def finish_load(self):
+        # Dates asked for while read() was still importing were read without their reminders
+        self.specific_rows = {}
+        self.data_version = self.read_data_version()
+
+    def source_files(self):
+        if self.import_pending:
+            return JournalStore(self.legacy_path).source_files()
+        return [self.path, self.path + "-journal"]
+
+    def read_data_version(self):
+        with self.write_lock:
+            return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll_changes(self):
+        # The daily and recurring reminders in memory are stale once another process has committed
+        return [] if self.read_data_version() == self.data_version else None
+
+    def import_json(self, db, path):
+        legacy = read_legacy(path)
+        with db:
+            db.executemany("INSERT INTO daily (text) VALUES (?)",
+                           [(text,) for text in legacy.daily_reminders])
+            db.executemany("INSERT INTO recurring (text, rule) VALUES (?, ?)",
+                           [(item["text"], item["rule"]) for item in legacy.recurring_reminders])
+            db.executemany("INSERT INTO specific (date, text) VALUES (?, ?)",
+                           [(date, text) for date, texts in legacy.reminders_between() for text in texts])
+
+    def save(self):
+        self.write_pending()
+
+    def stage(self, change):
+        pass
+
+    @perf.timed("storage.commit")
+    def write_pending(self):
+        with self.write_lock:
+            if self.db is not None:
+                self.db.commit()
+
+    def close(self):
+        with self.write_lock:
+            if self.db is not None:
+                self.db.commit()
+                self.db.close()
+                self.db = None
+
+    def rows_on(self, date):
+        """Return the [(id, text)] of a date as first read, kept up to date by apply(). Holds write_lock."""
+        rows = self.specific_rows.get(date)
+        if rows is None:
+            rows = self.specific_rows[date] = self.db.execute(
+                "SELECT id, text FROM specific WHERE date = ? ORDER BY id", (date,)).fetchall()
+        return rows
+
+    @staticmethod
+    def check_changed(cursor):
+        """Refuse a change that found no row, as another process changed or removed the reminder."""
+        if cursor.rowcount == 0:
+            perf.count("storage.conflicts")
+            raise ValueError("The reminder was changed or removed by another process")
+
+    def apply(self, change):
+        with self.write_lock:
+            op = change["op"]
+            if op == "add_daily":
+                cursor = self.db.execute("INSERT INTO daily (text) VALUES (?)", (change["text"],))
+                self.daily_ids.append(cursor.lastrowid)
+                self.daily_reminders.append(change["text"])
+            elif op == "update_daily":
+                self.check_changed(self.db.execute(
+                    "UPDATE daily SET text = ? WHERE id = ? AND text = ?",
+                    (change["text"], self.daily_ids[change["index"]], self.daily_reminders[change["index"]])))
+                self.daily_reminders[change["index"]] = change["text"]
+            elif op == "delete_daily":
+                self.check_changed(self.db.execute(
+                    "DELETE FROM daily WHERE id = ? AND text = ?",
+                    (self.daily_ids[change["index"]], self.daily_reminders[change["index"]])))
+                del self.daily_ids[change["index"]]
+                del self.daily_reminders[change["index"]]
+            elif op == "add_recurring":
+                cursor = self.db.execute("INSERT INTO recurring (text, rule) VALUES (?, ?)", (change["text"], change["rule"]))
+                self.recurring_ids.append(cursor.lastrowid)
+                self.recurring_reminders.append({"text": change["text"], "rule": change["rule"]})
+            elif op == "update_recurring":
+                old = self.recurring_reminders[change["index"]]
+                self.check_changed(self.db.execute(
+                    "UPDATE recurring SET text = ?, rule = ? WHERE id = ? AND text = ? AND rule = ?",
+                    (change["text"], change["rule"], self.recurring_ids[change["index"]], old["text"], old["rule"])))
+                self.recurring_reminders[change["index"]] = {"text": change["text"], "rule": change["rule"]}
+            elif op == "delete_recurring":
+                old = self.recurring_reminders[change["index"]]
+                self.check_changed(self.db.execute(
+                    "DELETE FROM recurring WHERE id = ? AND text = ? AND rule = ?",
+                    (self.recurring_ids[change["index"]], old["text"], old["rule"])))
+                del self.recurring_ids[change["index"]]
+                del self.recurring_reminders[change["index"]]
+            elif op == "add_specific":
+                cursor = self.db.execute("INSERT INTO specific (date, text) VALUES (?, ?)",
+                                         (change["date"], change["text"]))
+                if change["date"] in self.specific_rows:
+                    self.specific_rows[change["date"]].append((cursor.lastrowid, change["text"]))
+            elif op == "update_specific":
+                rows = self.rows_on(change["date"])
+                row_id, old = rows[change["position"]]
+                self.check_changed(self.db.execute("UPDATE specific SET text = ? WHERE id = ? AND text = ?",
+                                                   (change["text"], row_id, old)))
+                rows[change["position"]] = (row_id, change["text"])
+            elif op == "delete_specific":
+                rows = self.rows_on(change["date"])
+                row_id, old = rows[change["position"]]
+                self.check_changed(self.db.execute("DELETE FROM specific WHERE id = ? AND text = ?", (row_id, old)))
+                del rows[change["position"]]
+            else:
+                raise ValueError(f"Unknown reminder operation: {op}")
+
+    def reminders_on(self, date):
+        with self.write_lock:
+            return [text for row_id, text in self.rows_on(date)]
+
+    def reminders_between(self, start=None, end=None):
+        query = "SELECT date, id, text FROM specific WHERE date >= ?"
+        params = [start or ""]
+        if end is not None:
+            query += " AND date < ?"
+            params.append(end)
+        query += " ORDER BY date, id"
+        with self.write_lock:
+            dates = {}
+            for date, row_id, text in self.db.execute(query, params):
+                dates.setdefault(date, []).append((row_id, text))
+            # Dates read before keep their rows as read then, so positions stay as handed out
+            dates = [(date, self.specific_rows.setdefault(date, rows)) for date, rows in dates.items()]
+        for date, rows in dates:
+            if rows:
+                yield date, [text for row_id, text in rows]
+
+
+class BackgroundWriter:
+    """Persists a store's staged changes on a worker thread.
+
+    schedule() is called after each staged change. The write happens once no
+    change has come in for delay seconds, or max_delay seconds after the first
+    change of a burst, so a burst of edits costs a single write. flush()
+    writes what is staged right away on the calling thread. A failed
+    background write is passed to on_error and its changes stay staged for
+    the next write.
+    """
+    def __init__(self, store, delay=0.5, max_delay=3.0, on_error=None):
+        self.store = store
+        self.delay = delay
+        self.max_delay = max_delay
+        self.on_error = on_error or (lambda e: print(f"Error saving reminders: {e}"))
+        self.condition = threading.Condition()
+        self.first_change = None
+        self.due = None
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def schedule(self):
+        with self.condition:
+            now = time.monotonic()
+            if self.first_change is None:
+                self.first_change = now
+            self.due = min(now + self.delay, self.first_change + self.max_delay)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and (self.due is None or time.monotonic() < self.due):
+                    self.condition.wait(None if self.due is None else self.due - time.monotonic())
+                if self.stopped:
+                    return
+                self.first_change = self.due = None
+            try:
+                self.store.write_pending()
+            except Exception as e:
+                self.on_error(e)
+
+    def flush(self):
+        with self.condition:
+            self.first_change = self.due = None
+        self.store.write_pending()
+
+    def stop(self):
+        """Stop the worker without writing; store.close() persists what is left."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,275 @@
+"""Bulk import and export of reminders as CSV, iCalendar or JSON files.
+
+    .csv    a header row naming kind, date, text and rule columns; kind may be
+            left out, and is then specific with a date, recurring with a
+            rule and daily otherwise
+    .jsonl  one {"kind", "date", "text", "rule"} object per line
+    .json   the layout of reminders.json, read and written whole
+    .ics    each VEVENT becomes a specific reminder on its start date with
+            its SUMMARY as text; repeating events only on their first date.
+            Only specific reminders are exported.
+
+Files other than .json are read and written one reminder at a time. An
+import is parsed and checked in full by parse_file() before anything is
+added, so that part can run off the UI thread, and the result is added in
+one batch with Reminders.add_many().
+"""
+import os
+import re
+import csv
+import json
+import datetime
+import functools
+from collections import namedtuple
+from . import perf
+from .recurrence import parse_rule
+
+PROGRESS_EVERY = 1000
+MAX_ERRORS = 100
+ICS_ESCAPE = re.compile(r"\\([\\;,nN])")
+
+# items are (kind, text, date, rule) tuples ready for Reminders.add_many();
+# errors describe the first MAX_ERRORS of the skipped records
+ParsedFile = namedtuple('ParsedFile', ['items', 'errors', 'skipped'])
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text):
+    """Return a YYYY-MM-DD or YYYYMMDD date as YYYY-MM-DD.
+
+    Cached, as a bulk file tends to repeat a few dates many times.
+    """
+    if len(text) == 8 and text.isdigit():
+        text = f"{text[:4]}-{text[4:6]}-{text[6:]}"
+    return datetime.date.fromisoformat(text).isoformat()
+
+
+def check(fields):
+    """Turn the fields of one record into a (kind, text, date, rule) item or raise ValueError."""
+    if not isinstance(fields, dict):
+        raise ValueError("not a reminder")
+    text = str(fields.get("text") or "").strip()
+    date = str(fields.get("date") or "").strip()
+    rule = str(fields.get("rule") or "").strip()
+    kind = str(fields.get("kind") or "").strip().lower() or ("specific" if date else "recurring" if rule else "daily")
+    if not text:
+        raise ValueError("no text")
+    if kind == 'specific':
+        try:
+            return kind, text, parse_date(date), None
+        except ValueError:
+            raise ValueError(f"bad date {date!r}") from None
+    if kind == 'recurring':
+        return kind, text, None, parse_rule(rule).describe()
+    if kind == 'daily':
+        return kind, text, None, None
+    raise ValueError(f"unknown kind {kind!r}")
+
+
+def read_csv(f):
+    reader = csv.DictReader(f)
+    try:
+        for fields in reader:
+            yield f"line {reader.line_num}", fields
+    except csv.Error as e:
+        raise ValueError(f"line {reader.line_num}: {e}") from None
+
+
+def read_jsonl(f):
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield f"line {number}", json.loads(line)
+            except ValueError:
+                yield f"line {number}", None
+
+
+def read_json(f):
+    data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("not a reminders file")
+    for key, expected in (("daily_reminders", list), ("recurring_reminders", list), ("specific_date_reminders", dict)):
+        if not isinstance(data.get(key, expected()), expected):
+            raise ValueError(f"{key} is not a {'list' if expected is list else 'mapping'}")
+    # Entries of the wrong type become None, which check() reports and skips
+    records = [{"kind": "daily", "text": text} if isinstance(text, str) else None
+               for text in data.get("daily_reminders", [])]
+    records += [dict(item, kind="recurring") if isinstance(item, dict) else None
+                for item in data.get("recurring_reminders", [])]
+    for date, texts in data.get("specific_date_reminders", {}).items():
+        # Older files hold a single string per date
+        for text in [texts] if isinstance(texts, str) else texts if isinstance(texts, list) else [None]:
+            records.append({"kind": "specific", "date": date, "text": text} if isinstance(text, str) else None)
+    for number, fields in enumerate(records, 1):
+        yield f"reminder {number}", fields
+
+
+def unfold(f):
+    """Yield (line number, content line) with folded iCalendar lines joined up again."""
+    start, current = 0, None
+    for number, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        start, current = number, line
+    if current is not None:
+        yield start, current
+
+
+def read_ics(f):
+    event = None
+    for number, line in unfold(f):
+        name, _, value = line.partition(":")
+        name = name.partition(";")[0].upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {"kind": "specific"}
+            start = number
+        elif event is None:
+            continue
+        elif name == "END" and value.upper() == "VEVENT":
+            yield f"line {start}", event
+            event = None
+        elif name == "DTSTART":
+            # A date, or a date and time of which only the date is kept
+            event["date"] = value[:8]
+        elif name == "SUMMARY":
+            event["text"] = ICS_ESCAPE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def reminder_items(store):
+    """Yield every reminder in store as a (kind, text, date, rule) item."""
+    for text in store.daily_reminders:
+        yield 'daily', text, None, None
+    for item in store.recurring_reminders:
+        yield 'recurring', item["text"], None, item["rule"]
+    for date, texts in store.reminders_between():
+        for text in texts:
+            yield 'specific', text, date, None
+
+
+def write_csv(f, items):
+    writer = csv.writer(f)
+    writer.writerow(["kind", "date", "text", "rule"])
+    count = 0
+    for kind, text, date, rule in items:
+        writer.writerow([kind, date or "", text, rule or ""])
+        count += 1
+    return count
+
+
+def write_jsonl(f, items):
+    count = 0
+    for kind, text, date, rule in items:
+        record = {"kind": kind, "text": text}
+        if date:
+            record["date"] = date
+        if rule:
+            record["rule"] = rule
+        f.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+
+def write_json(f, items):
+    data = {"specific_date_reminders": {}, "daily_reminders": [], "recurring_reminders": []}
+    count = 0
+    for kind, text, date, rule in items:
+        if kind == 'daily':
+            data["daily_reminders"].append(text)
+        elif kind == 'recurring':
+            data["recurring_reminders"].append({"text": text, "rule": rule})
+        else:
+            data["specific_date_reminders"].setdefault(date, []).append(text)
+        count += 1
+    json.dump(data, f)
+    return count
+
+
+def fold(line):
+    """Split an iCalendar content line into pieces of at most 75 bytes."""
+    pieces, piece, size = [], [], 0
+    for char in line:
+        length = len(char.encode('utf-8'))
+        # Continuation lines start with a space, which counts towards their 75
+        if size + length > (74 if pieces else 75):
+            pieces.append("".join(piece))
+            piece, size = [], 0
+        piece.append(char)
+        size += length
+    pieces.append("".join(piece))
+    return "\r\n ".join(pieces) + "\r\n"
+
+
+def write_ics(f, items):
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//ReminderApp//Reminders//EN\r\n")
+    count = 0
+    for kind, text, date, rule in items:
+        if kind != 'specific':
+            continue
+        count += 1
+        summary = text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+        f.write("BEGIN:VEVENT\r\n")
+        f.write(f"UID:{date}-{count}@reminderapp\r\n")
+        f.write(f"DTSTAMP:{stamp}\r\n")
+        f.write(f"DTSTART;VALUE=DATE:{date.replace('-', '')}\r\n")
+        f.write(fold(f"SUMMARY:{summary}"))
+        f.write("END:VEVENT\r\n")
+    f.write("END:VCALENDAR\r\n")
+    return count
+
+
+FORMATS = {
+    ".csv": (read_csv, write_csv),
+    ".jsonl": (read_jsonl, write_jsonl),
+    ".json": (read_json, write_json),
+    ".ics": (read_ics, write_ics),
+}
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot import or export {extension or 'files without an extension'}; "
+                         f"use {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+@perf.timed("import.parse")
+def parse_file(path, progress=None):
+    """Read and check every reminder in a file and return a ParsedFile.
+
+    progress(fraction) is called on the calling thread every PROGRESS_EVERY
+    records with how much of the file has been read.
+    """
+    reader = file_format(path)[0]
+    size = os.path.getsize(path) or 1
+    items, errors, skipped = [], [], 0
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for count, (where, fields) in enumerate(reader(f), 1):
+            try:
+                items.append(check(fields))
+            except ValueError as e:
+                skipped += 1
+                if len(errors) < MAX_ERRORS:
+                    errors.append(f"{where}: {e}")
+            if progress is not None and count % PROGRESS_EVERY == 0:
+                # The buffer reads ahead, so this runs a little early
+                progress(min(f.buffer.tell() / size, 1.0))
+    if progress is not None:
+        progress(1.0)
+    return ParsedFile(items, errors, skipped)
+
+
+@perf.timed("export")
+def export_file(items, path):
+    """Write (kind, text, date, rule) items, e.g. reminder_items(store), to path; return how many were written."""
+    writer = file_format(path)[1]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        count = writer(f, items)
+    os.replace(tmp_path, path)
+    return count
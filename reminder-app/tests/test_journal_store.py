@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from reminder_core.storage import BackgroundWriter, JournalStore
+
+
+class StagedSnapshotTest(unittest.TestCase):
+    """Changes staged after a snapshot must still reach the disk."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "reminders.json")
+        self.store = JournalStore(self.path, compact_every=5)
+        self.store.load()
+        # Long enough that nothing is written before flush()
+        self.store.writer = BackgroundWriter(self.store, delay=5, max_delay=5)
+
+    def tearDown(self):
+        self.store.writer.stop()
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def reloaded(self):
+        store = JournalStore(self.path)
+        store.load()
+        store.close()
+        return store.daily_reminders
+
+    def test_burst_past_compact_every(self):
+        for number in range(7):
+            self.store.add_daily(f"daily {number}")
+        self.store.writer.flush()
+        self.assertEqual(self.reloaded(), [f"daily {number}" for number in range(7)])
+
+    def test_edit_after_import(self):
+        self.store.update_many([{"op": "add_daily", "text": f"imported {number}"} for number in range(3)])
+        self.store.add_daily("added")
+        self.store.update_daily(0, "edited")
+        self.store.writer.flush()
+        self.assertEqual(self.reloaded(), ["edited", "imported 1", "imported 2", "added"])
+
+    def test_later_changes_survive_a_failed_write(self):
+        for number in range(5):
+            self.store.add_daily(f"daily {number}")
+        os.makedirs(self.path + ".tmp")
+        with self.assertRaises(OSError):
+            self.store.writer.flush()
+        os.rmdir(self.path + ".tmp")
+        self.store.add_daily("after the failure")
+        self.store.writer.flush()
+        self.assertEqual(self.reloaded(), [f"daily {number}" for number in range(5)] + ["after the failure"])
+
+
+class DamagedFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "reminders.json")
+        with open(self.path, 'w') as f:
+            f.write("{not json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_set_aside_lets_a_new_store_save(self):
+        store = JournalStore(self.path)
+        with self.assertRaises(ValueError):
+            store.load()
+        store.close()
+        moved = store.set_aside()
+        self.assertEqual(len(moved), 1)
+        with open(moved[0]) as f:
+            self.assertEqual(f.read(), "{not json")
+        store = JournalStore(self.path)
+        store.load()
+        store.add_daily("water")
+        store.close()
+        store = JournalStore(self.path)
+        store.load()
+        store.close()
+        self.assertEqual(store.daily_reminders, ["water"])
+
+
+if __name__ == '__main__':
+    unittest.main()
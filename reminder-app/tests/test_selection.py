@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from reminder_core.selection import ShuffleBag
+
+
+class SavedRoundTest(unittest.TestCase):
+    """The round carries over a restart without rewriting the file on each draw."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "reminders.selection.json")
+        self.texts = [f"daily {number}" for number in range(10)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reloaded(self):
+        bag = ShuffleBag(self.path)
+        bag.load()
+        bag.close()
+        return bag
+
+    def test_draws_are_read_back_from_the_log(self):
+        bag = ShuffleBag(self.path)
+        bag.draw(self.texts)
+        written = os.path.getmtime(self.path)
+        for _ in range(4):
+            bag.draw(self.texts)
+        bag.changed()
+        bag.draw(self.texts + ["added"])
+        bag.close()
+        self.assertEqual(os.path.getmtime(self.path), written)
+        reloaded = self.reloaded()
+        self.assertEqual(sorted(reloaded.tickets), sorted(bag.tickets))
+        self.assertEqual(reloaded.last, bag.last)
+
+    def test_log_of_an_earlier_round_is_not_replayed(self):
+        bag = ShuffleBag(self.path)
+        for _ in range(len(self.texts) + 2):
+            bag.draw(self.texts)
+        bag.close()
+        # A crash between writing the file and emptying the log leaves it behind
+        log_path = os.path.splitext(self.path)[0] + ".log"
+        with open(log_path) as f:
+            lines = f.read()
+        with open(log_path, 'w') as f:
+            f.write(f'[{bag.round - 1}, 0, "{bag.tickets[0]}"]\n' + lines)
+        self.assertEqual(sorted(self.reloaded().tickets), sorted(bag.tickets))
+
+    def test_torn_last_line_is_ignored(self):
+        bag = ShuffleBag(self.path)
+        bag.draw(self.texts)
+        bag.close()
+        with open(os.path.splitext(self.path)[0] + ".log", 'a') as f:
+            f.write('[1, 0, "dai')
+        self.assertEqual(sorted(self.reloaded().tickets), sorted(bag.tickets))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from reminder_core.storage import JournalStore, SQLiteStore
+
+
+class TwoWritersTest(unittest.TestCase):
+    """Two stores on one database stand in for the app and the command line."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "reminders.db")
+        self.app = self.open()
+        self.app.add_specific("2025-03-01", "x")
+        self.app.add_specific("2025-03-01", "y")
+        self.app.add_daily("water")
+        self.app.add_daily("stretch")
+        self.assertEqual(self.app.reminders_on("2025-03-01"), ["x", "y"])
+        self.cli = self.open()
+
+    def tearDown(self):
+        self.app.close()
+        self.cli.close()
+        shutil.rmtree(self.directory)
+
+    def open(self):
+        store = SQLiteStore(self.path)
+        store.load()
+        return store
+
+    def on_disk(self, date):
+        store = self.open()
+        try:
+            return store.daily_reminders, store.reminders_on(date)
+        finally:
+            store.close()
+
+    def test_update_of_a_reminder_removed_elsewhere_is_refused(self):
+        self.cli.delete_specific("2025-03-01", 0)
+        self.cli.add_specific("2025-03-01", "z")
+        with self.assertRaises(ValueError):
+            self.app.update_specific("2025-03-01", 0, "x edited")
+        self.app.save()
+        self.assertEqual(self.on_disk("2025-03-01")[1], ["y", "z"])
+        self.assertIsNone(self.app.poll_changes())
+
+    def test_position_means_the_row_it_was_read_as(self):
+        self.cli.delete_specific("2025-03-01", 0)
+        # Position 1 is still y to the app, although y is first on disk now
+        self.app.update_specific("2025-03-01", 1, "y edited")
+        with self.assertRaises(ValueError):
+            self.app.delete_specific("2025-03-01", 0)
+        self.app.save()
+        self.assertEqual(self.on_disk("2025-03-01")[1], ["y edited"])
+
+    def test_daily_changes_to_a_reminder_changed_elsewhere_are_refused(self):
+        self.cli.update_daily(0, "drink water")
+        self.cli.delete_daily(1)
+        with self.assertRaises(ValueError):
+            self.app.update_daily(0, "water plants")
+        with self.assertRaises(ValueError):
+            self.app.delete_daily(1)
+        self.app.save()
+        self.assertEqual(self.on_disk("2025-03-01")[0], ["drink water"])
+
+
+class ImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.legacy_path = os.path.join(self.directory, "reminders.json")
+        legacy = JournalStore(self.legacy_path)
+        legacy.load()
+        legacy.add_specific("2025-03-01", "migrated")
+        legacy.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_date_read_during_the_import_is_read_again(self):
+        store = SQLiteStore(os.path.join(self.directory, "reminders.db"), legacy_path=self.legacy_path)
+        store.begin_load()
+        # The app shows today's reminders while the loading thread imports
+        self.assertEqual(store.reminders_on("2025-03-01"), [])
+        for batch in store.read():
+            store.add_loaded(batch)
+        store.finish_load()
+        self.assertEqual(store.reminders_on("2025-03-01"), ["migrated"])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()